@@ -0,0 +1,5 @@
+"""Drudge Report Archives scraper: search, archive editions, scoring,
+entity extraction, export and loading.  Run `python -m drudge --help` (from midterm/).
+
+Nothing heavy is imported here; each stage imports what it needs.
+"""
@@ -0,0 +1,209 @@
+"""python -m drudge <command> ...   (run from midterm/)
+
+    search   date-sharded searches -> deduplicated records (NDJSON)
+    archive  archived editions behind search hits -> stories (NDJSON)
+    score    VADER scores and emotion labels for records (NDJSON)
+    export   NDJSON -> Parquet
+    load     NDJSON / Parquet -> Postgres or SQLite
+    entities stories (NDJSON) -> entity -> (hash, archive_date) table (Parquet)
+
+Only `score`, `search --score` and `entities` load models; no command imports
+more than its own stage needs.
+"""
+import argparse
+import sys
+
+
+def make_fetcher(args):
+    from .fetch import Fetcher
+    from .pagestore import PageStore
+
+    return Fetcher(max_workers=args.fetch_workers, per_host=4, min_interval=0.25,
+                   store=PageStore(args.pages, ttl=3600), offline=args.offline)
+
+
+def emotion_options(args):
+    options = {"backend": args.emotion_backend, "batch_size": args.emotion_batch}
+    if args.emotion_backend == "onnx":
+        options.update(quantize=args.quantize, intra_op_threads=args.intra_op_threads)
+    return options
+
+
+def make_scorer(args):
+    from .emotion import make_classifier
+    from .scorecache import ScoreCache
+    from .scoring import Scorer
+
+    return Scorer(ScoreCache(args.scores, max_entries=2_000_000), make_classifier(**emotion_options(args)))
+
+
+def search(args):
+    from .dedup import SeenRegistry
+    from .shards import Checkpoint, fetch_and_parse, resume, shard_jobs
+    from .writers import NdjsonWriter
+
+    fetcher = make_fetcher(args)
+    registry = SeenRegistry.open(args.registry)
+    checkpoint = Checkpoint(args.checkpoint)
+
+    # with a persisted registry only records it hasn't seen are written, so the
+    # earlier runs' records have to stay in --out: append instead of truncating
+    with NdjsonWriter(args.out, mode="a" if args.registry else "w") as output:
+        if args.workers:
+            from .pipeline import Pipeline
+            from .scorecache import ScoreCache
+
+            with Pipeline(fetcher, ScoreCache(args.scores), registry, workers=args.workers,
+                          emotion_options=emotion_options(args)) as pipeline:
+                output.write_many(pipeline.search_shards(args.terms, args.start, args.end, checkpoint, args.by,
+                                                         score=args.score))
+        else:
+            scorer = make_scorer(args) if args.score else None
+            jobs = shard_jobs(args.terms, args.start, args.end, args.by)
+            for (term, _, _), results in resume(jobs, checkpoint, lambda todo: fetch_and_parse(fetcher, todo)):
+                new, retagged = registry.add(term, results)
+                if scorer:
+                    scorer(new)
+                output.write_many(new)
+                output.write_many(retagged)
+
+    checkpoint.close()
+    fetcher.close()
+    if args.registry:
+        registry.save(args.registry)
+
+
+def archive(args):
+    from .archive import ArchiveStage
+    from .writers import NdjsonWriter, read_ndjson
+
+    hits = [
+        {"archive_url": record["archive_url"], "archive_date": record["archive_date"]}
+        for record in read_ndjson(args.records)
+        if args.term is None or args.term in record.get("query_names", [record["query_name"]])
+    ]
+    fetcher = make_fetcher(args)
+    # with a persisted registry only records it hasn't seen are written, so the
+    # earlier runs' records have to stay in --out: append instead of truncating
+    with NdjsonWriter(args.out, mode="a" if args.registry else "w") as output:
+        for archive_url, stories in ArchiveStage(fetcher).stream(hits):
+            if stories is not None:
+                output.write_many({"archive_url": archive_url, **story} for story in stories)
+    fetcher.close()
+
+
+def score(args):
+    from itertools import islice
+
+    from .writers import NdjsonWriter, read_ndjson
+
+    if args.out == args.records:
+        sys.exit("--out has to be a different file from the records being scored")
+
+    scorer = make_scorer(args)
+    records = read_ndjson(args.records)
+    # with a persisted registry only records it hasn't seen are written, so the
+    # earlier runs' records have to stay in --out: append instead of truncating
+    with NdjsonWriter(args.out, mode="a" if args.registry else "w") as output:
+        while batch := list(islice(records, args.batch_size)):
+            output.write_many(scorer(batch))
+    scorer.score_cache.close()
+
+
+def export(args):
+    from .writers import export_parquet, schemas
+
+    if args.stories:
+        export_parquet(args.records, args.out, schemas()["STORY_SCHEMA"])
+    else:
+        export_parquet(args.records, args.out, schemas()["SEARCH_SCHEMA"], key="hash")
+
+
+def load(args):
+    from .loader import open_loader, read_records
+
+    loader = open_loader(args.target)
+    print(f"loaded {loader.load(read_records(args.records))} records")
+    loader.close()
+
+
+def entities(args):
+    from .entities import EntityStage, entity_rows
+    from .scorecache import ScoreCache
+    from .writers import ParquetSink, read_ndjson, schemas
+
+    cache = ScoreCache(args.scores, max_entries=2_000_000)
+    with EntityStage(cache, args.model, n_process=args.n_process, batch_size=args.batch_size) as stage, \
+            ParquetSink(args.out, schemas()["ENTITY_SCHEMA"]) as table:
+        for story, found in stage.run(read_ndjson(args.stories)):
+            table.write_many(entity_rows(story, found))
+    cache.close()
+
+
+def main(argv=None):
+    fetching = argparse.ArgumentParser(add_help=False)
+    fetching.add_argument("--pages", default="pages", help="page store directory")
+    fetching.add_argument("--offline", action="store_true", help="only use pages already in the page store")
+    fetching.add_argument("--fetch-workers", type=int, default=8)
+
+    scoring = argparse.ArgumentParser(add_help=False)
+    scoring.add_argument("--scores", default="scores.sqlite", help="score cache")
+    scoring.add_argument("--emotion-batch", type=int, default=32)
+    scoring.add_argument("--emotion-backend", choices=("transformers", "onnx"), default="transformers")
+    scoring.add_argument("--no-quantize", dest="quantize", action="store_false", help="onnx: keep fp32 weights")
+    scoring.add_argument("--intra-op-threads", type=int, help="onnx: ONNX Runtime threads (default: one per core)")
+
+    parser = argparse.ArgumentParser(prog="python -m drudge", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("search", parents=[fetching, scoring], help="date-sharded searches")
+    command.add_argument("terms", nargs="+")
+    command.add_argument("--start", default="2024-03-01")
+    command.add_argument("--end", default="2026-03-01")
+    command.add_argument("--by", choices=("month", "week"), default="month")
+    command.add_argument("--checkpoint", default="search_checkpoint.ndjson")
+    command.add_argument("--registry", help="persisted SeenRegistry to dedupe against earlier runs (--out is then appended to)")
+    command.add_argument("--score", action="store_true", help="score new records as they are found")
+    command.add_argument("--workers", type=int, default=0, help="run the process-pool pipeline with this many workers")
+    command.add_argument("--out", default="output.ndjson")
+    command.set_defaults(run=search)
+
+    command = commands.add_parser("archive", parents=[fetching], help="archived editions behind search hits")
+    command.add_argument("records", nargs="?", default="output.ndjson")
+    command.add_argument("--term", help="only hits found by this search term")
+    command.add_argument("--out", default="output_daily_historic_view.ndjson")
+    command.set_defaults(run=archive)
+
+    command = commands.add_parser("score", parents=[scoring], help="score search records")
+    command.add_argument("records", nargs="?", default="output.ndjson")
+    command.add_argument("--batch-size", type=int, default=256)
+    command.add_argument("--out", default="output_scored.ndjson")
+    command.set_defaults(run=score)
+
+    command = commands.add_parser("export", help="NDJSON to Parquet")
+    command.add_argument("records", nargs="?", default="output.ndjson")
+    command.add_argument("--stories", action="store_true", help="archive stories rather than search records")
+    command.add_argument("--out", default="output.parquet")
+    command.set_defaults(run=export)
+
+    command = commands.add_parser("load", help="load records into Postgres or SQLite")
+    command.add_argument("records", nargs="?", default="output.ndjson")
+    command.add_argument("--target", default="headlines.sqlite", help="postgresql:// DSN or SQLite file")
+    command.set_defaults(run=load)
+
+    command = commands.add_parser("entities", help="named entities in archived stories")
+    command.add_argument("stories", nargs="?", default="output_daily_historic_view.ndjson")
+    command.add_argument("--model", default="en_core_web_sm", help="spaCy pipeline")
+    command.add_argument("--n-process", type=int, default=2)
+    command.add_argument("--batch-size", type=int, default=256)
+    command.add_argument("--scores", default="scores.sqlite", help="cache of entities per headline hash")
+    command.add_argument("--out", default="entities.parquet")
+    command.set_defaults(run=entities)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
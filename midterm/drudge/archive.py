@@ -0,0 +1,52 @@
+from .parsers import parse_archive
+
+
+class ArchiveStage:
+    """Archived editions keyed by `archive_url`.
+
+    Several search hits often point at the same edition; each edition is
+    fetched and parsed once and the parsed stories are memoized, so every
+    hit on that edition maps onto the same list.  Failed fetches are not
+    memoized and are tried again on the next `run`.
+    """
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+        self.editions = {}
+
+    def run(self, hits):
+        """Return `{archive_url: stories}` for the distinct editions among
+        `hits`, in first-hit order (stories is None for pages without a
+        DR-HU-MAIN block or that could not be fetched)."""
+        return dict(self.stream(hits))
+
+    def stream(self, hits):
+        """`(archive_url, stories)` like `run`, in the same order, but each
+        edition is yielded as soon as it (and every edition before it) has
+        been fetched and parsed, so the next stage can start while the rest
+        are still in flight.  Editions that arrive early wait at most as
+        long as the fetcher's small in-flight window."""
+        wanted = {}
+        for hit in hits:
+            if hit["archive_url"]:
+                wanted.setdefault(hit["archive_url"], hit["archive_date"])
+
+        urls = list(wanted)
+        todo = [url for url in urls if url not in self.editions]
+        finished = set(self.editions)
+        position = 0
+
+        def ready():
+            nonlocal position
+            while position < len(urls) and urls[position] in finished:
+                yield urls[position], self.editions.get(urls[position])
+                position += 1
+
+        yield from ready()
+        for index, url, html, error in self.fetcher.fetch_all(todo):
+            if error:
+                print(f"skipping {url}: {error}")
+            else:
+                self.editions[url] = parse_archive(html, wanted[url])
+            finished.add(url)
+            yield from ready()
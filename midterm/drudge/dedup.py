@@ -0,0 +1,229 @@
+import hashlib
+import os
+import pickle
+import re
+import zlib
+from datetime import datetime
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+# Mersenne prime for the MinHash permutations; keeps a * x + b inside uint64
+PRIME = (1 << 31) - 1
+
+
+class HeadlineIndex:
+    """Near-duplicate headline lookup with the same rule as the original
+    loop in `process_results` (`fuzz.token_set_ratio(seen, new) >= 95`),
+    without scoring every new headline against every seen one.
+
+    Candidates come from two blocking schemes and only they get scored:
+
+    * token blocking: seen headlines sharing a (lowercased) word, skipping
+      words so common their postings would be most of the index
+    * MinHash-LSH over character 3-grams: near-identical strings that
+      don't share a whole word (typos, punctuation, "..." suffixes)
+
+    A pair scoring >= 95 either shares most of its words or is almost the
+    same string, so it lands in at least one of the two.  Scoring is done
+    in bulk with `rapidfuzz.process.cdist`.  The index pickles to disk so
+    later runs dedupe against everything stored without rescoring it.
+    """
+
+    def __init__(self, threshold=95, num_perm=32, bands=16, max_posting=5000, batch_size=256, seed=5035):
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_posting = max_posting
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+
+        self.headlines = []
+        self.postings = {}
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.headlines)
+
+    def tokens(self, headline):
+        return set(headline.lower().split())
+
+    def band_keys(self, headline):
+        text = " ".join(headline.lower().split())
+        shingles = {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+        hashed = np.fromiter((zlib.crc32(s.encode()) % PRIME for s in shingles), dtype=np.uint64, count=len(shingles))
+        signature = ((self.a[:, None] * hashed[None, :] + self.b[:, None]) % PRIME).min(axis=1)
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def candidates(self, headline):
+        found = set()
+        for token in self.tokens(headline):
+            posting = self.postings.get(token, ())
+            if len(posting) <= self.max_posting:
+                found.update(posting)
+        for key in self.band_keys(headline):
+            found.update(self.buckets.get(key, ()))
+        return found
+
+    def insert(self, headline):
+        doc = len(self.headlines)
+        self.headlines.append(headline)
+        for token in self.tokens(headline):
+            self.postings.setdefault(token, []).append(doc)
+        for key in self.band_keys(headline):
+            self.buckets.setdefault(key, []).append(doc)
+
+    def match_many(self, headlines):
+        """Return, per headline, the id (position in `self.headlines`) of a
+        seen headline it matches, or None if it is new.  New headlines are
+        added as they are accepted, so later ones in the same batch are
+        checked against earlier ones, exactly like the sequential loop."""
+        if not headlines:
+            return []
+
+        # against what was already indexed: one cdist per slice of the batch,
+        # over the union of that slice's candidates
+        match = np.full(len(headlines), -1, dtype=np.int64)
+        for start in range(0, len(headlines), self.batch_size):
+            batch = headlines[start:start + self.batch_size]
+            ids = sorted(set().union(*(self.candidates(h) for h in batch)))
+            if ids:
+                scores = process.cdist(batch, [self.headlines[i] for i in ids], scorer=fuzz.token_set_ratio,
+                                       score_cutoff=self.threshold, workers=-1)
+                best = scores.argmax(axis=1)
+                found = scores[np.arange(len(batch)), best] >= self.threshold
+                match[start:start + len(batch)] = np.where(found, np.asarray(ids)[best], -1)
+
+        # within the batch: a headline is a duplicate of an earlier accepted
+        # one, which is already indexed by then, so blocking finds it too
+        start = len(self.headlines)
+        matches = []
+        for i, headline in enumerate(headlines):
+            if match[i] >= 0:
+                matches.append(int(match[i]))
+                continue
+            recent = [j for j in self.candidates(headline) if j >= start]
+            found = recent and process.extractOne(headline, [self.headlines[j] for j in recent],
+                                                  scorer=fuzz.token_set_ratio, score_cutoff=self.threshold)
+            if found:
+                matches.append(recent[found[2]])
+                continue
+            self.insert(headline)
+            matches.append(None)
+        return matches
+
+    def check_many(self, headlines):
+        """Return one bool per headline: True if it is new (see `match_many`)."""
+        return [match is None for match in self.match_many(headlines)]
+
+    def add(self, headline):
+        """True (and indexed) if no seen headline is a >= threshold match."""
+        return self.check_many([headline])[0]
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump(self.__dict__, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        index = cls.__new__(cls)
+        with open(path, "rb") as file:
+            index.__dict__.update(pickle.load(file))
+        return index
+
+
+def normalize(headline):
+    # exact-repeat key: case, spacing and a trailing "..." don't matter
+    return re.sub(r"\s+", " ", headline).strip().rstrip(".").strip().lower()
+
+
+class SeenRegistry:
+    """Run-level registry of kept search records shared by every query.
+
+    A hit whose article url, normalized headline or fuzzy headline match
+    (`HeadlineIndex`) was already kept under any query doesn't become a
+    new record: its query is added to the canonical record's
+    `query_names` instead, so each unique story is scored once however
+    many queries surface it.  Pickles to disk to carry across runs.
+    """
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else HeadlineIndex(threshold=95)
+        self.records = {}
+        self.urls = {}
+        self.normalized = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, query_name, results):
+        """Split one query's parsed hits into `(new, retagged)`: new
+        canonical records (unscored, `emotion`/`scores` None) and already
+        kept records that `query_name` was just added to."""
+        new = []
+        retagged = {}
+
+        def tag(record, item):
+            self.urls.setdefault(item["article_url"], record)
+            if query_name not in record["query_names"]:
+                record["query_names"].append(query_name)
+                retagged[id(record)] = record
+
+        fresh = []
+        fresh_urls = set()
+        for item in results:
+            url = item["article_url"]
+            if url in fresh_urls:
+                continue
+            record = self.urls.get(url) or self.normalized.get(normalize(item["headline"]))
+            if record is not None:
+                tag(record, item)
+                continue
+            fresh_urls.add(url)
+            fresh.append(item)
+
+        # fuzzy check against everything already kept (token_set_ratio >= 95),
+        # scored only against blocked candidates
+        doc = len(self.index)
+        for item, match in zip(fresh, self.index.match_many([item["headline"] for item in fresh])):
+            if match is not None:
+                record = self.records.get(match)
+                if record is not None:
+                    tag(record, item)
+                continue
+
+            item["query_name"] = query_name
+            item["query_names"] = [query_name]
+            item["emotion"] = None  # filled in by the scoring stage, keeps the output key order
+            item["scores"] = None
+            item["hash"] = hashlib.sha256(item["headline"].encode()).hexdigest()
+            item["scraped_at"] = datetime.utcnow().isoformat()
+            self.records[doc] = item
+            self.urls[item["article_url"]] = item
+            self.normalized.setdefault(normalize(item["headline"]), item)
+            new.append(item)
+            doc += 1
+
+        return new, list(retagged.values())
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            pickle.dump(self.__dict__, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        registry = cls.__new__(cls)
+        with open(path, "rb") as file:
+            registry.__dict__.update(pickle.load(file))
+        return registry
+
+    @classmethod
+    def open(cls, path=None):
+        """The registry saved at `path` if there is one, else a new one."""
+        if path and os.path.exists(path):
+            return cls.load(path)
+        return cls()
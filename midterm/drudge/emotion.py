@@ -0,0 +1,236 @@
+import os
+
+
+MODEL = "j-hartmann/emotion-english-distilroberta-base"
+
+
+class EmotionClassifier:
+    """Emotion labels for a list of headlines, run through the
+    transformers pipeline in batches.
+
+    The model is only loaded on the first call, so scrape-only runs never
+    pay for it.  Inputs are sorted by length before batching (less padding
+    per batch) and the results are put back in input order; each result
+    has the same shape as `emotion(headline)` had: a list of
+    `{"label", "score"}` dicts, `top_k` long.
+    """
+
+    def __init__(self, model=MODEL, revision="main", batch_size=32, top_k=1, truncation=True, max_length=128, device=-1):
+        self.model = model
+        self.revision = revision
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.truncation = truncation
+        self.max_length = max_length
+        self.device = device
+        self._pipeline = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from transformers import pipeline
+
+            self._pipeline = pipeline("text-classification", model=self.model, revision=self.revision, device=self.device)
+        return self._pipeline
+
+    @property
+    def cache_key(self):
+        # what ScoreCache keys this model's outputs by
+        return f"{self.model}@{self.revision}/top_k={self.top_k}"
+
+    def classify(self, headlines):
+        return self.pipeline(
+            headlines,
+            batch_size=self.batch_size,
+            top_k=self.top_k,
+            truncation=self.truncation,
+            max_length=self.max_length,
+        )
+
+    def __call__(self, headlines):
+        headlines = list(headlines)
+        if not headlines:
+            return []
+
+        order = sorted(range(len(headlines)), key=lambda i: len(headlines[i]))
+        outputs = self.classify([headlines[i] for i in order])
+
+        results = [None] * len(headlines)
+        for i, output in zip(order, outputs):
+            results[i] = output if isinstance(output, list) else [output]
+        return results
+
+
+class OnnxEmotionClassifier(EmotionClassifier):
+    """The same model and outputs, run with ONNX Runtime on CPU.
+
+    On first use the model is exported to ONNX under `cache_dir` (once per
+    model and revision) and, with `quantize`, its weights are dynamically
+    quantized to int8.  `intra_op_threads` sets ONNX Runtime's thread
+    count (None: one per core).  Its outputs are not bit-identical to the
+    transformers pipeline, so it has its own `cache_key`; check label
+    agreement with `python -m drudge.emotion parity`.
+    """
+
+    def __init__(self, model=MODEL, revision="main", batch_size=32, top_k=1, truncation=True, max_length=128,
+                 quantize=True, intra_op_threads=None, cache_dir="onnx"):
+        super().__init__(model, revision, batch_size, top_k, truncation, max_length)
+        self.quantize = quantize
+        self.intra_op_threads = intra_op_threads
+        self.cache_dir = cache_dir
+        self._session = None
+
+    @property
+    def cache_key(self):
+        return f"{super().cache_key}/onnx{'-int8' if self.quantize else ''}"
+
+    @property
+    def directory(self):
+        return os.path.join(self.cache_dir, f"{self.model.replace('/', '--')}@{self.revision}")
+
+    def export(self):
+        """Write model.onnx (and model.int8.onnx), the tokenizer and the
+        config to `directory`, unless they are there already; returns the
+        path of the model to run."""
+        directory = self.directory
+        exported = os.path.join(directory, "model.onnx")
+        quantized = os.path.join(directory, "model.int8.onnx")
+
+        if not os.path.exists(exported):
+            import torch
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+            tokenizer = AutoTokenizer.from_pretrained(self.model, revision=self.revision)
+            network = AutoModelForSequenceClassification.from_pretrained(self.model, revision=self.revision).eval()
+            sample = tokenizer(["an example headline"], return_tensors="pt")
+
+            os.makedirs(directory, exist_ok=True)
+            partial = exported + ".partial"
+            with torch.no_grad():
+                torch.onnx.export(
+                    network,
+                    (sample["input_ids"], sample["attention_mask"]),
+                    partial,
+                    input_names=["input_ids", "attention_mask"],
+                    output_names=["logits"],
+                    dynamic_axes={
+                        "input_ids": {0: "batch", 1: "sequence"},
+                        "attention_mask": {0: "batch", 1: "sequence"},
+                        "logits": {0: "batch"},
+                    },
+                    opset_version=17,
+                )
+            tokenizer.save_pretrained(directory)
+            network.config.save_pretrained(directory)
+            os.replace(partial, exported)
+
+        if not self.quantize:
+            return exported
+        if not os.path.exists(quantized):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(exported, quantized + ".partial", weight_type=QuantType.QInt8)
+            os.replace(quantized + ".partial", quantized)
+        return quantized
+
+    @property
+    def session(self):
+        if self._session is None:
+            import onnxruntime
+            from transformers import AutoConfig, AutoTokenizer
+
+            path = self.export()
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+            options.inter_op_num_threads = 1
+            if self.intra_op_threads:
+                options.intra_op_num_threads = self.intra_op_threads
+
+            self.tokenizer = AutoTokenizer.from_pretrained(self.directory)
+            labels = AutoConfig.from_pretrained(self.directory).id2label
+            self.labels = [labels[i] for i in range(len(labels))]
+            self._session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        return self._session
+
+    def classify(self, headlines):
+        import numpy as np
+
+        session = self.session
+        outputs = []
+        for start in range(0, len(headlines), self.batch_size):
+            encoded = self.tokenizer(headlines[start:start + self.batch_size], padding=True, truncation=self.truncation,
+                                     max_length=self.max_length, return_tensors="np")
+            (logits,) = session.run(None, {
+                "input_ids": encoded["input_ids"].astype(np.int64),
+                "attention_mask": encoded["attention_mask"].astype(np.int64),
+            })
+            # softmax, as the text-classification pipeline does for single-label models
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            for row in probabilities:
+                best = np.argsort(-row)[:self.top_k]
+                outputs.append([{"label": self.labels[i], "score": float(row[i])} for i in best])
+        return outputs
+
+
+BACKENDS = {
+    "transformers": EmotionClassifier,
+    "onnx": OnnxEmotionClassifier,
+}
+
+
+def make_classifier(backend="transformers", **options):
+    """The emotion classifier for `backend` ("transformers" or "onnx");
+    `options` are that class's arguments."""
+    return BACKENDS[backend](**options)
+
+
+def parity(headlines, reference, candidate):
+    """Label agreement and throughput of `candidate` against `reference`."""
+    import time
+
+    report = {}
+    labels = {}
+    for name, classifier in (("reference", reference), ("candidate", candidate)):
+        classifier(headlines[:8])  # load / export outside the timing
+        started = time.perf_counter()
+        labels[name] = [result[0]["label"] for result in classifier(headlines)]
+        report[f"{name}_per_sec"] = len(headlines) / (time.perf_counter() - started)
+
+    agree = sum(a == b for a, b in zip(labels["reference"], labels["candidate"]))
+    report["headlines"] = len(headlines)
+    report["agreement"] = agree / len(headlines) if headlines else 1.0
+    report["speedup"] = report["candidate_per_sec"] / report["reference_per_sec"]
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(prog="python -m drudge.emotion",
+                                     description="label agreement of the ONNX backend with the transformers pipeline")
+    parser.add_argument("command", choices=["parity"])
+    parser.add_argument("records", nargs="?", default="output.json")
+    parser.add_argument("--model", default=MODEL, help="hub id or local directory of the checkpoint")
+    parser.add_argument("--revision", default="main")
+    parser.add_argument("--no-quantize", dest="quantize", action="store_false")
+    parser.add_argument("--intra-op-threads", type=int)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open(args.records) as file:
+        headlines = [record["headline"] for record in json.load(file)]
+
+    report = parity(
+        headlines,
+        EmotionClassifier(args.model, args.revision, batch_size=args.batch_size),
+        OnnxEmotionClassifier(args.model, args.revision, batch_size=args.batch_size, quantize=args.quantize,
+                              intra_op_threads=args.intra_op_threads),
+    )
+    for key, value in report.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+    raise SystemExit(0 if report["agreement"] >= args.min_agreement else 1)
@@ -0,0 +1,122 @@
+"""Named entities (people, organizations, places, ...) in archived stories.
+
+`EntityStage.run` consumes a stream of stories (`headline`, `hash`,
+`archive_date`), never the whole list: stories are taken `chunk_size` at
+a time (by default `batch_size` per worker, a few editions' worth), headlines already in the `ScoreCache` are answered from it, and
+the rest are split across `n_process` worker processes, each holding one
+spaCy pipeline (tok2vec + ner only) and running `nlp.pipe` over its share.
+At most `window` chunks are in flight, so the stage keeps pace with the
+fetcher feeding it without pulling stories ahead unboundedly.
+
+`entity_rows` flattens the results to the compact entity table
+(`writers.schemas()["ENTITY_SCHEMA"]`): one row per distinct entity per
+story, with the story's hash and archive date.
+"""
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from itertools import chain, islice
+
+
+MODEL = "en_core_web_sm"
+
+# proper-noun-like entity types; dates, numbers, money etc. are left out
+LABELS = ("PERSON", "NORP", "FAC", "ORG", "GPE", "LOC", "PRODUCT", "EVENT", "WORK_OF_ART", "LAW")
+
+# components NER doesn't need; not loaded at all
+UNUSED = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer", "textcat"]
+
+
+def chunked(items, size):
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+# per-process spaCy pipeline
+nlp = None
+
+
+def load_nlp(model):
+    global nlp
+    import spacy
+
+    nlp = spacy.load(model, exclude=UNUSED)
+
+
+def extract(texts, labels, batch_size):
+    return [
+        [[ent.text, ent.label_] for ent in doc.ents if ent.label_ in labels]
+        for doc in nlp.pipe(texts, batch_size=batch_size)
+    ]
+
+
+class EntityStage:
+    """Streaming, cached, multi-process NER over stories; use it as a
+    context manager so the workers are shut down."""
+
+    def __init__(self, cache, model=MODEL, labels=LABELS, n_process=2, batch_size=256, chunk_size=None, window=None):
+        self.cache = cache
+        self.model = model
+        self.labels = tuple(labels)
+        self.n_process = n_process
+        self.batch_size = batch_size
+        # small enough that the first jobs start after a few editions, not
+        # after the fetcher is done
+        self.chunk_size = chunk_size or batch_size * n_process
+        self.window = window or 2
+        # forkserver: workers start while the archive fetch threads are running,
+        # and forking a threaded process can copy a lock one of them holds
+        self.pool = ProcessPoolExecutor(n_process, mp_context=multiprocessing.get_context("forkserver"),
+                                        initializer=load_nlp, initargs=(model,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    @property
+    def cache_key(self):
+        try:
+            model_version = version(self.model)
+        except PackageNotFoundError:
+            model_version = "local"
+        return f"spacy:{self.model}@{model_version}/ner/{','.join(self.labels)}"
+
+    def run(self, stories):
+        """`(story, entities)` per story, in order; entities is a list of
+        `[text, label]`."""
+        key = self.cache_key
+        pending = deque()
+        for chunk in chunked(stories, self.chunk_size):
+            found, missing = self.cache.lookup(key, [story["hash"] for story in chunk],
+                                               [story["headline"] for story in chunk])
+            texts = list(missing.values())
+            share = max(-(-len(texts) // self.n_process), 1)
+            futures = [self.pool.submit(extract, part, self.labels, self.batch_size) for part in chunked(texts, share)]
+            pending.append((chunk, found, missing, futures))
+            # wait only when the window is full; otherwise just hand on
+            # whatever is already done
+            while pending and (len(pending) >= self.window or all(future.done() for future in pending[0][3])):
+                yield from self.collect(key, *pending.popleft())
+        while pending:
+            yield from self.collect(key, *pending.popleft())
+
+    def collect(self, key, chunk, found, missing, futures):
+        if futures:
+            fresh = dict(zip(missing, chain.from_iterable(future.result() for future in futures)))
+            self.cache.put_many(fresh, key)
+            found.update(fresh)
+        for story in chunk:
+            yield story, found[story["hash"]]
+
+
+def entity_rows(story, entities):
+    """Entity-table rows for one story: each distinct (entity, label) once."""
+    for text, label in dict.fromkeys(map(tuple, entities)):
+        yield {"entity": text, "label": label, "hash": story["hash"], "archive_date": story["archive_date"]}
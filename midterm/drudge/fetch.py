@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class Fetcher:
+    """Polite concurrent page fetcher.
+
+    One keep-alive `requests.Session` is shared by a pool of `max_workers`
+    threads.  Per host, at most `per_host` requests are in flight and
+    starts are spaced at least `min_interval` seconds apart.  Transient
+    failures (connection errors, 429 and 5xx) are retried with exponential
+    backoff, honouring Retry-After, and every request has a timeout.
+
+    With a `PageStore`, stored archive editions are served from disk,
+    stale search pages are revalidated with a conditional GET, and
+    `offline=True` never touches the network at all.
+    """
+
+    def __init__(self, max_workers=8, per_host=4, min_interval=0.25, timeout=30, retries=5, backoff_factor=0.5,
+                 store=None, offline=False):
+        self.store = store
+        self.offline = offline
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self.next_start = {}
+
+    def polite_wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def get(self, url):
+        """GET one page and return its text; raises on a final failure."""
+        entry = self.store.lookup(url) if self.store else None
+        cached = self.store.read(entry) if entry else None
+
+        if cached is not None and (self.offline or self.store.is_fresh(url, entry)):
+            return cached
+        if self.offline:
+            raise LookupError(f"offline and not in the page store: {url}")
+
+        headers = {}
+        if cached is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        host = urlsplit(url).netloc
+        with self.lock:
+            slot = self.slots[host]
+        with slot:
+            self.polite_wait(host)
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+
+        if response.status_code == 304 and cached is not None:
+            self.store.touch(url)
+            return cached
+        response.raise_for_status()
+
+        if self.store:
+            encoding = response.encoding or response.apparent_encoding
+            self.store.put(url, response.content, encoding,
+                           response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.text
+
+    def fetch_all(self, urls):
+        """Yield `(index, url, text, error)` for every url as soon as it
+        arrives (completion order, not input order).  Only about two pages
+        per worker are in flight or waiting at once, so a long url list
+        doesn't pile up in memory ahead of the parser."""
+        urls = list(urls)
+        pending = {}
+        position = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while position < len(urls) or pending:
+                while position < len(urls) and len(pending) < 2 * self.max_workers:
+                    pending[pool.submit(self.get, urls[position])] = position
+                    position += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    error = future.exception()
+                    yield index, urls[index], None if error else future.result(), error
+
+    def close(self):
+        self.session.close()
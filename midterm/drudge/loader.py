@@ -0,0 +1,191 @@
+"""Bulk loader for scraped search records: Postgres via COPY, or SQLite
+when there is no server.
+
+    python -m drudge load output.ndjson                                 # -> headlines.sqlite
+    python -m drudge load output.parquet --target postgresql://localhost/drudge
+
+Records are upserted on their sha256 `hash`, so loading the output of a
+repeated scrape updates rows instead of duplicating them (the most
+recent `scraped_at` wins; `query_names` tags from every load are
+merged).  `archive_date` ("February 28, 2026" on the site) is stored as
+a date, and `archive_date` and `query_name` are indexed for the trend
+queries.
+"""
+import json
+from datetime import datetime
+from itertools import islice
+
+
+COLUMNS = ("hash", "headline", "article_url", "archive_date", "edition_time", "archive_url",
+           "query_name", "query_names", "emotion", "scores", "scraped_at")
+
+POSTGRES_TABLE = """
+    CREATE TABLE IF NOT EXISTS headlines (
+        hash TEXT PRIMARY KEY,
+        headline TEXT NOT NULL,
+        article_url TEXT,
+        archive_date DATE,
+        edition_time TIME,
+        archive_url TEXT,
+        query_name TEXT,
+        query_names JSONB,
+        emotion JSONB,
+        scores JSONB,
+        scraped_at TIMESTAMP
+    )"""
+
+SQLITE_TABLE = """
+    CREATE TABLE IF NOT EXISTS headlines (
+        hash TEXT PRIMARY KEY,
+        headline TEXT NOT NULL,
+        article_url TEXT,
+        archive_date TEXT,
+        edition_time TEXT,
+        archive_url TEXT,
+        query_name TEXT,
+        query_names TEXT,
+        emotion TEXT,
+        scores TEXT,
+        scraped_at TEXT
+    )"""
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS headlines_archive_date ON headlines (archive_date)",
+    "CREATE INDEX IF NOT EXISTS headlines_query_name ON headlines (query_name)",
+)
+
+# the newest scrape of a hash wins, except that query_names from every load
+# of it are merged
+NEWEST = ", ".join(
+    f"{column} = CASE WHEN excluded.scraped_at >= headlines.scraped_at THEN excluded.{column} ELSE headlines.{column} END"
+    for column in COLUMNS[1:] if column != "query_names"
+)
+
+POSTGRES_UPDATE = NEWEST + """, query_names = (
+    SELECT jsonb_agg(DISTINCT name) FROM jsonb_array_elements_text(headlines.query_names || excluded.query_names) AS name)"""
+
+SQLITE_UPDATE = NEWEST + """, query_names = (
+    SELECT json_group_array(value) FROM (
+        SELECT value FROM json_each(headlines.query_names) UNION SELECT value FROM json_each(excluded.query_names)))"""
+
+
+def archive_day(text):
+    try:
+        return datetime.strptime(text, "%B %d, %Y").date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def row(record):
+    """A record from process_results / the NDJSON or Parquet output as a
+    tuple in COLUMNS order."""
+    hash_ = record["hash"]
+    scraped_at = record.get("scraped_at")
+    return (
+        hash_.hex() if isinstance(hash_, bytes) else hash_,
+        record["headline"],
+        record.get("article_url"),
+        archive_day(record.get("archive_date")),
+        record.get("edition_time") or None,
+        record.get("archive_url"),
+        record.get("query_name"),
+        json.dumps(record.get("query_names") or [record.get("query_name")]),
+        json.dumps(record.get("emotion")),
+        json.dumps(record.get("scores")),
+        scraped_at.isoformat() if isinstance(scraped_at, datetime) else scraped_at,
+    )
+
+
+def read_records(path, batch_size=10_000):
+    """Records from an .ndjson or .parquet output file, streamed."""
+    if str(path).endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+    else:
+        from .writers import read_ndjson
+
+        yield from read_ndjson(path)
+
+
+def batches(records, size):
+    records = iter(records)
+    while batch := [row(record) for record in islice(records, size)]:
+        yield batch
+
+
+class PostgresLoader:
+    """COPY each batch into a temporary staging table, then upsert it into
+    `headlines` with one INSERT ... ON CONFLICT."""
+
+    def __init__(self, dsn):
+        import psycopg
+
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        with self.conn.transaction():
+            self.conn.execute(POSTGRES_TABLE)
+            for index in INDEXES:
+                self.conn.execute(index)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS headlines_query_names ON headlines USING GIN (query_names)")
+
+    def load(self, records, batch_size=50_000):
+        columns = ", ".join(COLUMNS)
+        loaded = 0
+        for batch in batches(records, batch_size):
+            with self.conn.transaction(), self.conn.cursor() as cursor:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS headlines_stage (LIKE headlines) ON COMMIT DELETE ROWS")
+                with cursor.copy(f"COPY headlines_stage ({columns}) FROM STDIN") as copy:
+                    for values in batch:
+                        copy.write_row(values)
+                # one row per hash, or ON CONFLICT would touch a row twice; a
+                # record written again in one run only ever gains query_names
+                cursor.execute(f"""
+                    INSERT INTO headlines ({columns})
+                    SELECT DISTINCT ON (hash) {columns} FROM headlines_stage
+                    ORDER BY hash, scraped_at DESC, jsonb_array_length(query_names) DESC
+                    ON CONFLICT (hash) DO UPDATE SET {POSTGRES_UPDATE}""")
+            loaded += len(batch)
+        return loaded
+
+    def close(self):
+        self.conn.close()
+
+
+class SqliteLoader:
+    """The same table and upsert in a local SQLite file, one transaction
+    per batch."""
+
+    def __init__(self, path="headlines.sqlite"):
+        import sqlite3
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(SQLITE_TABLE)
+        for index in INDEXES:
+            self.db.execute(index)
+        self.db.commit()
+
+    def load(self, records, batch_size=50_000):
+        marks = ", ".join("?" * len(COLUMNS))
+        upsert = f"""
+            INSERT INTO headlines ({", ".join(COLUMNS)}) VALUES ({marks})
+            ON CONFLICT (hash) DO UPDATE SET {SQLITE_UPDATE}"""
+        loaded = 0
+        for batch in batches(records, batch_size):
+            with self.db:
+                self.db.executemany(upsert, batch)
+            loaded += len(batch)
+        return loaded
+
+    def close(self):
+        self.db.close()
+
+
+def open_loader(target="headlines.sqlite"):
+    """PostgresLoader for a postgres:// / postgresql:// DSN, else SqliteLoader on a file path."""
+    if target.startswith(("postgres://", "postgresql://")):
+        return PostgresLoader(target)
+    return SqliteLoader(target)
+
@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+# archived editions (/data/YYYY/MM/DD/...) never change once published
+ARCHIVE_PAGE = re.compile(r"^https?://(www\.)?drudgereportarchives\.com/data/")
+
+
+class PageStore:
+    """Content-addressed, gzip-compressed store of fetched pages.
+
+    Bodies live in `root/objects/<2 hex>/<sha256>.gz`, named by the sha256
+    of the uncompressed bytes, so identical pages are stored once and every
+    read is checked against its name.  `root/index.sqlite` maps each url to
+    its body plus the validators (ETag / Last-Modified) needed to revalidate.
+
+    Urls matching `immutable` (archive editions) never expire; anything else
+    (search pages) is fresh for `ttl` seconds and then revalidated with a
+    conditional GET.
+    """
+
+    def __init__(self, root="pages", ttl=3600, immutable=ARCHIVE_PAGE):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.immutable = immutable
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(self.root / "index.sqlite", check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )""")
+        self.db.commit()
+
+    def object_path(self, digest):
+        return self.root / "objects" / digest[:2] / f"{digest}.gz"
+
+    def lookup(self, url):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT sha256, encoding, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        digest, encoding, etag, last_modified, fetched_at = row
+        return {"sha256": digest, "encoding": encoding, "etag": etag, "last_modified": last_modified, "fetched_at": fetched_at}
+
+    def is_fresh(self, url, entry):
+        return bool(self.immutable.match(url)) or time.time() - entry["fetched_at"] < self.ttl
+
+    def read(self, entry):
+        """The stored page text, or None if the object is missing or corrupt."""
+        try:
+            body = gzip.decompress(self.object_path(entry["sha256"]).read_bytes())
+        except (OSError, EOFError):
+            return None
+        if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            return None
+        return body.decode(entry["encoding"] or "utf-8", errors="replace")
+
+    def put(self, url, body, encoding=None, etag=None, last_modified=None):
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(gzip.compress(body))
+            tmp.replace(path)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages (url, sha256, encoding, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (url, digest, encoding, etag, last_modified, time.time()),
+            )
+            self.db.commit()
+        return digest
+
+    def touch(self, url):
+        """Mark a revalidated (304) page fresh again."""
+        with self.lock:
+            self.db.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
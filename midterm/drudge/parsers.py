@@ -0,0 +1,395 @@
+"""Parsers for Drudge Report Archives search-result and edition pages.
+
+Two interchangeable backends produce the same records:
+
+* "html.parser": the original BeautifulSoup walk (the reference)
+* "lxml": libxml2 parse plus XPath that goes straight to the result
+  paragraphs / the DR-HU-MAIN block and its 33% columns instead of
+  walking a Python object tree
+
+    python -m drudge.parsers check    # golden check against output*.json
+    python -m drudge.parsers bench    # pages/sec per backend
+
+Both commands run from midterm/ on the pages in fixtures/ (offline);
+with --live they use every page behind output.json instead, through the
+page store (fetching any that are missing).
+
+The fixtures are synthetic (see fixtures/README): hand-built in the
+site's markup, not saved copies of it.  The offline check shows the
+backends agree on that markup; it does not validate lxml against real
+pages.  Run `check --live` before relying on the lxml default.
+"""
+import hashlib
+import re
+from datetime import datetime
+
+
+DEFAULT_BACKEND = "lxml"
+
+FROM_THE = re.compile("From the")
+EDITION_TIME = re.compile(r"(\d{2}:\d{2}:\d{2})")
+
+
+def looks_like_story(text):
+    if not text:
+        return False
+    if len(text) < 25:
+        return False
+    if "EMAIL:" in text:
+        return False
+    return True
+
+
+def story(text, url, col_index, archive_date):
+    return {
+        "headline": text,
+        "url": url,
+        "column": col_index,
+        "archive_date": archive_date,
+        "hash": hashlib.sha256(text.encode()).hexdigest(),
+        "scraped_at": datetime.utcnow().isoformat()
+    }
+
+
+#######################################################################
+# html.parser (reference)
+#######################################################################
+
+def parse_drudge_soup(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+
+    blocks = soup.find_all("p", style="margin-bottom:4px;")
+
+    for block in blocks:
+
+        strong = block.find("strong")
+        if not strong:
+            continue
+
+        link = strong.find("a")
+        if not link: continue
+        headline = link.get_text(strip=True)
+        article_url = link["href"]
+
+        meta = block.find_next(string=FROM_THE)
+        if not meta:
+            continue
+
+        archive_link = meta.find_next("a")
+        archive_date = ""
+        edition_time = ""
+        archive_url = ""
+        if archive_link:
+            archive_date = archive_link.get_text(strip=True)
+            archive_url = archive_link["href"]
+
+            if archive_link.parent:
+                full_text = archive_link.parent.get_text(" ", strip=True)
+
+                time_match = EDITION_TIME.search(full_text)
+                edition_time = time_match.group(1) if time_match else None
+
+        results.append({
+            "headline": headline,
+            "article_url": article_url,
+            "archive_date": archive_date,
+            "edition_time": edition_time,
+            "archive_url": archive_url,
+        })
+
+    return results
+
+
+def parse_archive_soup(html, archive_date):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    main_block = soup.find("div", id="DR-HU-MAIN")
+    if not main_block:
+        return None
+
+    # this shows as an error down here but runs fine
+    headline_table = main_block.find_next("table")
+    columns = headline_table.find_all("td", width="33%")
+
+    stories = []
+
+    for col_index, col in enumerate(columns):
+
+        for aa in col.find_all("a", href=True):
+            text = aa.get_text(" ", strip=True)
+
+            if looks_like_story(text):
+                stories.append(story(text, aa["href"], col_index, archive_date))
+
+    return stories
+
+
+#######################################################################
+# lxml
+#######################################################################
+
+def strings(element):
+    """Text nodes under `element` in document order, like bs4's
+    `_all_strings`: comments, script and style contribute nothing."""
+    if element.text and element.tag not in ("script", "style"):
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            yield from strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def get_text(element, separator=""):
+    # same as bs4 get_text(separator, strip=True)
+    return separator.join(s.strip() for s in strings(element) if s.strip())
+
+
+def next_a(text_node):
+    """bs4's `string.find_next("a")` for an lxml text node: the first <a>
+    after the string in document order."""
+    owner = text_node.getparent()
+    if text_node.is_tail:
+        found = owner.xpath("following::a[1]")
+    else:
+        found = owner.xpath("(descendant::a | following::a)[1]")
+    return found[0] if found else None
+
+
+# a carriage return in text, i.e. one whose next angle bracket opens a tag
+TEXT_CR = re.compile(r"\r(?=[^<>]*<)")
+
+
+def document(html):
+    """lxml document for `html`.  libxml2 turns CRLF into LF while parsing
+    and html.parser doesn't (the saved headlines keep their "\r\n"), so
+    carriage returns in text go in as character references, which are
+    not normalized."""
+    import lxml.html
+
+    return lxml.html.document_fromstring(TEXT_CR.sub("&#13;", html))
+
+
+def parse_drudge_lxml(html):
+    doc = document(html)
+    results = []
+
+    for block in doc.xpath('//p[@style="margin-bottom:4px;"]'):
+        strong = block.xpath("(.//strong)[1]")
+        if not strong:
+            continue
+
+        link = strong[0].xpath("(.//a)[1]")
+        if not link: continue
+        link = link[0]
+        headline = get_text(link)
+        article_url = link.attrib["href"]
+
+        meta = block.xpath('(descendant::text() | following::text())[contains(., "From the")][1]')
+        if not meta:
+            continue
+
+        archive_link = next_a(meta[0])
+        archive_date = ""
+        edition_time = ""
+        archive_url = ""
+        if archive_link is not None:
+            archive_date = get_text(archive_link)
+            archive_url = archive_link.attrib["href"]
+
+            parent = archive_link.getparent()
+            if parent is not None:
+                time_match = EDITION_TIME.search(get_text(parent, " "))
+                edition_time = time_match.group(1) if time_match else None
+
+        results.append({
+            "headline": headline,
+            "article_url": article_url,
+            "archive_date": archive_date,
+            "edition_time": edition_time,
+            "archive_url": archive_url,
+        })
+
+    return results
+
+
+def parse_archive_lxml(html, archive_date):
+    doc = document(html)
+
+    main_block = doc.xpath('(//div[@id="DR-HU-MAIN"])[1]')
+    if not main_block:
+        return None
+
+    headline_table = main_block[0].xpath("(descendant::table | following::table)[1]")[0]
+    columns = headline_table.xpath('.//td[@width="33%"]')
+
+    stories = []
+
+    for col_index, col in enumerate(columns):
+
+        for aa in col.xpath(".//a[@href]"):
+            text = get_text(aa, " ")
+
+            if looks_like_story(text):
+                stories.append(story(text, aa.attrib["href"], col_index, archive_date))
+
+    return stories
+
+
+#######################################################################
+# dispatch
+#######################################################################
+
+PARSERS = {
+    "html.parser": (parse_drudge_soup, parse_archive_soup),
+    "lxml": (parse_drudge_lxml, parse_archive_lxml),
+}
+
+
+def parse_drudge(html, backend=DEFAULT_BACKEND):
+    """Search-result records: headline, article_url, archive_date,
+    edition_time, archive_url."""
+    return PARSERS[backend][0](html)
+
+
+def parse_archive(html, archive_date, backend=DEFAULT_BACKEND):
+    """Stories from the 33% headline columns of one archived edition, or
+    None when the page has no DR-HU-MAIN block."""
+    return PARSERS[backend][1](html, archive_date)
+
+
+#######################################################################
+# golden check / benchmark
+#######################################################################
+
+SEARCH_URL = "https://www.drudgereportarchives.com/dsp/search.htm?searchFor={}&searchStartDate=2024-03-01&searchEndDate=2026-03-01"
+
+SEARCH_FIELDS = ("headline", "article_url", "archive_date", "edition_time", "archive_url")
+STORY_FIELDS = ("headline", "url", "column", "archive_date", "hash")
+
+
+FIXTURES = "fixtures"
+
+
+def saved_pages(fetcher, output="output.json"):
+    """(search pages by query, archive pages by url) behind the saved output."""
+    import json
+
+    with open(output) as file:
+        saved = json.load(file)
+
+    queries = dict.fromkeys(item["query_name"] for item in saved)
+    search = {query: fetcher.get(SEARCH_URL.format(query.replace(" ", "+"))) for query in queries}
+    archive = {}
+    for item in saved:
+        if item["query_name"] == "moon" and item["archive_url"] and item["archive_url"] not in archive:
+            archive[item["archive_url"]] = (fetcher.get(item["archive_url"]), item["archive_date"])
+    return search, archive
+
+
+def fixture_pages(fixtures=FIXTURES):
+    """(search pages by query, archive pages by url) from `fixtures/`: a
+    search page per saved query and a few of the moon editions, listed in
+    its manifest.json, so the check runs without the network."""
+    import json
+    import os
+
+    def read(name):
+        with open(os.path.join(fixtures, name), encoding="utf-8", newline="") as file:
+            return file.read()
+
+    with open(os.path.join(fixtures, "manifest.json")) as file:
+        manifest = json.load(file)
+    search = {query: read(name) for query, name in manifest["search"].items()}
+    archive = {url: (read(page["file"]), page["archive_date"]) for url, page in manifest["archive"].items()}
+    return search, archive
+
+
+def check(search, archive, output="output.json", historic="output_daily_historic_view.json"):
+    """Every backend must give the reference records, and the reference
+    must reproduce what was saved in output.json / the historic view:
+    each query's saved records, and each parsed edition as a saved day."""
+    import json
+
+    with open(output) as file:
+        saved = json.load(file)
+    with open(historic) as file:
+        saved_days = {tuple(tuple(s[f] for f in STORY_FIELDS) for s in day) for day in json.load(file)}
+
+    def key(records, fields):
+        return [tuple(r[f] for f in fields) for r in records]
+
+    ok = True
+    for query, html in search.items():
+        reference = key(parse_drudge_soup(html), SEARCH_FIELDS)
+        missing = {tuple(item[f] for f in SEARCH_FIELDS) for item in saved if item["query_name"] == query} - set(reference)
+        print(f"search {query!r}: {len(reference)} records, {len(missing)} saved records not reproduced")
+        ok &= not missing
+        for backend, (parse, _) in PARSERS.items():
+            same = key(parse(html), SEARCH_FIELDS) == reference
+            print(f"  {backend}: {'identical' if same else 'DIFFERENT'}")
+            ok &= same
+
+    parsed = matched = 0
+    for url, (html, archive_date) in archive.items():
+        reference = parse_archive_soup(html, archive_date)
+        reference = None if reference is None else key(reference, STORY_FIELDS)
+        if reference is not None:
+            parsed += 1
+            if tuple(reference) in saved_days:
+                matched += 1
+            else:
+                print(f"  html.parser: stories for {url} don't match any saved day")
+                ok = False
+        for backend, (_, parse) in PARSERS.items():
+            stories = parse(html, archive_date)
+            if (None if stories is None else key(stories, STORY_FIELDS)) != reference:
+                print(f"  {backend}: DIFFERENT stories for {url}")
+                ok = False
+    print(f"archive: {len(archive)} editions, {parsed} with headline columns, {matched} match a saved day")
+    return ok
+
+
+def bench(search, archive, repeat=20):
+    import time
+
+    pages = len(search) + len(archive)
+    size = sum(map(len, search.values())) + sum(len(html) for html, _ in archive.values())
+    print(f"{pages} pages, {size / 1024:.0f} KiB, {repeat} passes")
+    rates = {}
+    for backend, (parse_search, parse_edition) in PARSERS.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for html in search.values():
+                parse_search(html)
+            for html, archive_date in archive.values():
+                parse_edition(html, archive_date)
+        rates[backend] = pages * repeat / (time.perf_counter() - started)
+        print(f"{backend}: {rates[backend]:.1f} pages/sec")
+    print(f"lxml vs html.parser: {rates['lxml'] / rates['html.parser']:.1f}x")
+    return rates
+
+
+if __name__ == "__main__":
+    import sys
+
+    command, live = sys.argv[1:2], "--live" in sys.argv[2:]
+    if command not in (["check"], ["bench"]):
+        sys.exit(__doc__)
+
+    if live:
+        from .fetch import Fetcher
+        from .pagestore import PageStore
+
+        pages = saved_pages(Fetcher(store=PageStore("pages")))
+    else:
+        pages = fixture_pages()
+
+    if command == ["check"]:
+        sys.exit(0 if check(*pages) else 1)
+    bench(*pages)
@@ -0,0 +1,287 @@
+"""Staged scrape pipeline for large, multi-query runs:
+
+    fetch -> parse -> dedupe -> score -> write
+
+* fetch: the polite `Fetcher` threads (I/O bound)
+* parse: pages go to a process pool, `parse_chunk` pages per work unit
+* dedupe: in order, in this process, through one `SeenRegistry` for all
+  queries (sequential state; its cdist scoring already uses every core)
+* score: VADER runs in the same process pool, `score_chunk` headlines per
+  work unit; the emotion model lives in one dedicated worker process, so
+  it is loaded once, and scores alongside VADER
+* write: whoever consumes the generator
+
+Each stage keeps at most `window` work units in flight and is pulled by
+the next one, so a slow stage stalls the ones before it instead of
+letting pages or records pile up in memory.  Records come out in the same
+order and with the same content as `walkthrough.py` writes them: each
+carries the `query_names` it had when dedupe emitted it, even though the
+registry keeps tagging it while it waits to be scored.
+
+    python -m drudge.pipeline    # the walkthrough scrape, month-sharded, on every core
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from .dedup import SeenRegistry
+from .emotion import make_classifier
+from .parsers import DEFAULT_BACKEND, parse_archive, parse_drudge
+from .scoring import vader_key
+from .shards import resume, shard_jobs
+
+
+def chunked(items, size):
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def ordered(pool, fn, items, window):
+    """`pool.map(fn, items)` that pulls `items` lazily and keeps at most
+    `window` calls in flight: the backpressure between stages."""
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+#######################################################################
+# worker processes
+#######################################################################
+
+# per-process state, created on first use in each worker
+analyzer = None
+classifier = None
+
+
+def parse_search_pages(pages, backend=DEFAULT_BACKEND):
+    return [(query_name, parse_drudge(html, backend)) for query_name, html in pages]
+
+
+def parse_edition_pages(pages, backend=DEFAULT_BACKEND):
+    return [(url, parse_archive(html, archive_date, backend)) for url, archive_date, html in pages]
+
+
+def vader_scores(texts):
+    global analyzer
+    if analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+        analyzer = SentimentIntensityAnalyzer()
+    return [analyzer.polarity_scores(text) for text in texts]
+
+
+def load_emotion(options):
+    global classifier
+    classifier = make_classifier(**options)
+
+
+def emotion_scores(texts):
+    return classifier(texts)
+
+
+#######################################################################
+# pipeline
+#######################################################################
+
+class Pipeline:
+    """The staged scrape over a `Fetcher` and a `ScoreCache`.
+
+    `registry` is the `SeenRegistry` shared by every query of the run
+    (pass a loaded one to dedupe against earlier runs).  `workers` CPU
+    processes (default: every core but the one left for the model worker)
+    parse and run VADER; `emotion_options` are the `make_classifier`
+    arguments (backend and model options) for the model worker.  Use it as a
+    context manager so the pools are shut down.
+    """
+
+    def __init__(self, fetcher, score_cache, registry=None, workers=None, parse_chunk=8, score_chunk=256, window=None,
+                 backend=DEFAULT_BACKEND, emotion_options=None):
+        self.fetcher = fetcher
+        self.score_cache = score_cache
+        self.registry = registry if registry is not None else SeenRegistry()
+        self.workers = workers or max((os.cpu_count() or 2) - 1, 1)
+        self.parse_chunk = parse_chunk
+        self.score_chunk = score_chunk
+        self.window = window or 2 * self.workers
+        self.backend = backend
+
+        emotion_options = emotion_options or {}
+        self.vader_key = vader_key()
+        self.emotion_key = make_classifier(**emotion_options).cache_key
+
+        self.io = ThreadPoolExecutor(fetcher.max_workers)
+        # forkserver: the pools are started while the fetcher's threads are
+        # running, and forking a threaded process can copy a held lock
+        context = multiprocessing.get_context("forkserver")
+        self.cpu = ProcessPoolExecutor(self.workers, mp_context=context)
+        self.model = ProcessPoolExecutor(1, mp_context=context, initializer=load_emotion,
+                                         initargs=(emotion_options,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for pool in (self.io, self.cpu, self.model):
+            pool.shutdown(cancel_futures=True)
+
+    def fetch(self, jobs):
+        """`(key, html)` for each `(key, url)` job, in job order; pages that
+        can't be fetched are reported and skipped."""
+        def get(job):
+            key, url = job
+            try:
+                return key, url, self.fetcher.get(url), None
+            except Exception as error:
+                return key, url, None, error
+
+        for key, url, html, error in ordered(self.io, get, jobs, 2 * self.fetcher.max_workers):
+            if error:
+                print(f"skipping {url}: {error}")
+                continue
+            yield key, html
+
+    def parse_search(self, pages):
+        """`(query_name, records)` per `(query_name, html)` search page."""
+        parse = partial(parse_search_pages, backend=self.backend)
+        for parsed in ordered(self.cpu, parse, chunked(pages, self.parse_chunk), self.window):
+            yield from parsed
+
+    def dedupe(self, parsed):
+        """`(record, query_names)` through the run's `SeenRegistry`: new
+        canonical records, plus already kept ones (re-emitted, already
+        scored) whenever another query is added to their `query_names`.
+        `query_names` is a copy taken at that point; the registry's list
+        keeps growing."""
+        for query_name, results in parsed:
+            new, retagged = self.registry.add(query_name, results)
+            for record in new + retagged:
+                yield record, list(record["query_names"])
+
+    def emit(self, tagged):
+        """The records as dedupe saw them: a copy with its own `query_names`."""
+        for record, query_names in tagged:
+            yield {**record, "query_names": query_names}
+
+    def score(self, tagged):
+        """Fill in `scores` (VADER) and `emotion`, `score_chunk` records at
+        a time; records scored already (or on their way) and cache hits are
+        not sent to the workers."""
+        pending = deque()
+        in_flight = set()
+        for batch in chunked(tagged, self.score_chunk):
+            pending.append(self.submit_scores(batch, in_flight))
+            if len(pending) >= self.window:
+                yield from self.emit(self.collect_scores(*pending.popleft(), in_flight))
+        while pending:
+            yield from self.emit(self.collect_scores(*pending.popleft(), in_flight))
+
+    def submit_scores(self, batch, in_flight):
+        todo = [item for item, _ in batch if item["scores"] is None and id(item) not in in_flight]
+        in_flight.update(id(item) for item in todo)
+        hashes = [item["hash"] for item in todo]
+        headlines = [item["headline"] for item in todo]
+        jobs = []
+        for model, pool, compute in ((self.vader_key, self.cpu, vader_scores), (self.emotion_key, self.model, emotion_scores)):
+            found, missing = self.score_cache.lookup(model, hashes, headlines) if todo else ({}, {})
+            future = pool.submit(compute, list(missing.values())) if missing else None
+            jobs.append((model, found, missing, future))
+        return batch, todo, jobs
+
+    def collect_scores(self, batch, todo, jobs, in_flight):
+        values = []
+        for model, found, missing, future in jobs:
+            if future is not None:
+                fresh = dict(zip(missing, future.result()))
+                self.score_cache.put_many(fresh, model)
+                found.update(fresh)
+            values.append([found[item["hash"]] for item in todo])
+
+        for item, score, result in zip(todo, *values):
+            item["scores"] = score
+            item["emotion"] = result
+            in_flight.discard(id(item))
+        return batch
+
+    def search(self, queries, score=True):
+        """Deduplicated records for `(query_name, url)` searches, scored
+        unless `score` is False."""
+        tagged = self.dedupe(self.parse_search(self.fetch(queries)))
+        return self.score(tagged) if score else self.emit(tagged)
+
+    def search_shards(self, terms, start, end, checkpoint, by="month", score=True):
+        """`search` over month/week shards of `start`..`end` per term, with
+        finished shards kept in (and read back from) `checkpoint`."""
+        jobs = shard_jobs(terms, start, end, by)
+        hits = resume(jobs, checkpoint, lambda todo: self.parse_search(self.fetch(todo)))
+        tagged = self.dedupe((term, results) for (term, _, _), results in hits)
+        return self.score(tagged) if score else self.emit(tagged)
+
+    def editions(self, hits):
+        """`(archive_url, stories)` for the distinct editions among `hits`,
+        in first-hit order, like `ArchiveStage.run` (stories is None for
+        pages without a DR-HU-MAIN block)."""
+        wanted = {}
+        for hit in hits:
+            if hit["archive_url"]:
+                wanted.setdefault(hit["archive_url"], hit["archive_date"])
+
+        pages = ((url, wanted[url], html) for url, html in self.fetch((url, url) for url in wanted))
+        parse = partial(parse_edition_pages, backend=self.backend)
+        for parsed in ordered(self.cpu, parse, chunked(pages, self.parse_chunk), self.window):
+            yield from parsed
+
+
+if __name__ == "__main__":
+    from .entities import EntityStage, entity_rows
+    from .fetch import Fetcher
+    from .pagestore import PageStore
+    from .scorecache import ScoreCache
+    from .shards import Checkpoint
+    from .writers import ENTITY_SCHEMA, SEARCH_SCHEMA, STORY_SCHEMA, NdjsonWriter, ParquetSink, Tee, export_parquet
+
+    terms = ["conspiracy theor", "moon", "nasa"]
+
+    fetcher = Fetcher(max_workers=8, per_host=4, min_interval=0.25, store=PageStore("pages", ttl=3600))
+    score_cache = ScoreCache("scores.sqlite", max_entries=2_000_000)
+    checkpoint = Checkpoint("search_checkpoint.ndjson")
+
+    with Pipeline(fetcher, score_cache, emotion_options={"batch_size": 32}) as pipeline:
+        # only what the archive stage needs is kept from the search records
+        moon = []
+        with NdjsonWriter("output.ndjson") as output:
+            for item in pipeline.search_shards(terms, "2024-03-01", "2026-03-01", checkpoint):
+                output.write(item)
+                if "moon" in item["query_names"]:
+                    moon.append({"archive_url": item["archive_url"], "archive_date": item["archive_date"]})
+        # re-tagged records are written again; the Parquet copy keeps one row per hash
+        export_parquet("output.ndjson", "output.parquet", SEARCH_SCHEMA, key="hash")
+
+        def archived(output):
+            # stories are written as their editions come in and passed
+            # straight on to the entity stage
+            for archive_url, stories in pipeline.editions(moon):
+                for story in stories or ():
+                    story = {"archive_url": archive_url, **story}
+                    output.write(story)
+                    yield story
+
+        with Tee(NdjsonWriter("output_daily_historic_view.ndjson"),
+                 ParquetSink("output_daily_historic_view.parquet", STORY_SCHEMA)) as output, \
+                EntityStage(score_cache) as entities, ParquetSink("entities.parquet", ENTITY_SCHEMA) as table:
+            for story, found in entities.run(archived(output)):
+                table.write_many(entity_rows(story, found))
+
+    checkpoint.close()
+    score_cache.close()
+    fetcher.close()
@@ -0,0 +1,84 @@
+import json
+import sqlite3
+import time
+
+
+class ScoreCache:
+    """On-disk cache of per-headline model outputs (VADER scores, emotion
+    labels, ...) in SQLite, keyed by the headline's sha256 `hash` plus a
+    model key such as "vader@3.3.2" or "<hf model>@<revision>".
+
+    Holds at most `max_entries` rows; hits refresh `last_used` and the
+    least recently used rows are evicted first.
+    """
+
+    # stay under SQLite's bound-parameter limit
+    CHUNK = 500
+
+    def __init__(self, path="scores.sqlite", max_entries=2_000_000):
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                value TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (hash, model)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.db.commit()
+
+    def get_many(self, hashes, model):
+        found = {}
+        now = time.time()
+        unique = list(dict.fromkeys(hashes))
+        for i in range(0, len(unique), self.CHUNK):
+            chunk = unique[i:i + self.CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.db.execute(f"SELECT hash, value FROM scores WHERE model = ? AND hash IN ({marks})", [model, *chunk])
+            found.update((h, json.loads(value)) for h, value in rows)
+            self.db.execute(f"UPDATE scores SET last_used = ? WHERE model = ? AND hash IN ({marks})", [now, model, *chunk])
+        self.db.commit()
+        return found
+
+    def put_many(self, values, model):
+        now = time.time()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO scores (hash, model, value, last_used) VALUES (?, ?, ?, ?)",
+            [(h, model, json.dumps(value), now) for h, value in values.items()],
+        )
+        self.evict()
+        self.db.commit()
+
+    def evict(self):
+        (count,) = self.db.execute("SELECT COUNT(*) FROM scores").fetchone()
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def lookup(self, model, hashes, texts):
+        """`(found, missing)`: cached values by hash, and the texts still to
+        score by hash (each distinct hash once)."""
+        found = self.get_many(hashes, model)
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, text)
+        return found, missing
+
+    def cached(self, model, hashes, texts, compute):
+        """Scores for `texts` (keyed by `hashes`), running `compute` on the
+        list of cache misses only and storing what it returns."""
+        found, missing = self.lookup(model, hashes, texts)
+        if missing:
+            fresh = dict(zip(missing, compute(list(missing.values()))))
+            self.put_many(fresh, model)
+            found.update(fresh)
+        return [found[h] for h in hashes]
+
+    def close(self):
+        self.db.close()
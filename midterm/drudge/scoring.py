@@ -0,0 +1,41 @@
+from importlib.metadata import version
+
+
+def vader_key():
+    # what ScoreCache keys VADER's outputs by
+    return f"vader@{version('vaderSentiment')}"
+
+
+class Scorer:
+    """VADER scores and emotion labels for search records, through a
+    `ScoreCache`: only headlines not scored before reach the models, and
+    VADER (like the `EmotionClassifier`) is only loaded when a miss needs
+    it."""
+
+    def __init__(self, score_cache, emotion):
+        self.score_cache = score_cache
+        self.emotion = emotion
+        self.vader_key = vader_key()
+        self._analyzer = None
+
+    def vader(self, texts):
+        if self._analyzer is None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+            self._analyzer = SentimentIntensityAnalyzer()
+        return [self._analyzer.polarity_scores(text) for text in texts]
+
+    def __call__(self, items):
+        """Fill in `scores` and `emotion` on the unscored `items` (in place;
+        the emotion model sees all their misses in one batched pass) and
+        return `items`."""
+        todo = [item for item in items if item["scores"] is None]
+        hashes = [item["hash"] for item in todo]
+        headlines = [item["headline"] for item in todo]
+        if todo:
+            scores = self.score_cache.cached(self.vader_key, hashes, headlines, self.vader)
+            emotions = self.score_cache.cached(self.emotion.cache_key, hashes, headlines, self.emotion)
+            for item, score, result in zip(todo, scores, emotions):
+                item["emotion"] = result
+                item["scores"] = score
+        return items
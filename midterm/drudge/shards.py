@@ -0,0 +1,135 @@
+"""Date-sharded search over the Drudge Report Archives.
+
+Instead of one `search.htm` request spanning the whole range per term,
+the range is split into month (or week) shards that are fetched and
+parsed concurrently.  Each finished shard's parsed hits are appended to
+a checkpoint file, so an interrupted run, or one over a longer range,
+only fetches the shards that are missing.
+
+Shards that reach today or later are never checkpointed: the archive is
+still growing there, so they are searched again on the next run.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+from .parsers import parse_drudge
+
+
+SEARCH_URL = "https://www.drudgereportarchives.com/dsp/search.htm?searchFor={term}&searchStartDate={start}&searchEndDate={end}"
+
+
+def search_url(term, start, end):
+    return SEARCH_URL.format(term=term.replace(" ", "+"), start=start, end=end)
+
+
+def plan(start, end, by="month"):
+    """Inclusive `(start, end)` ISO date shards covering `start`..`end`,
+    split on calendar months or Monday-based weeks, newest first (the
+    order the search lists its results in)."""
+    start, end = date.fromisoformat(str(start)), date.fromisoformat(str(end))
+    shards = []
+    day = start
+    while day <= end:
+        if by == "month":
+            following = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+        elif by == "week":
+            following = day + timedelta(days=7 - day.weekday())
+        else:
+            raise ValueError(f"unknown shard size {by!r}")
+        shards.append((day.isoformat(), min(following - timedelta(days=1), end).isoformat()))
+        day = following
+    return shards[::-1]
+
+
+def shard_jobs(terms, start, end, by="month"):
+    """`((term, start, end), url)` per shard, terms in order."""
+    for term in terms:
+        for shard_start, shard_end in plan(start, end, by):
+            yield (term, shard_start, shard_end), search_url(term, shard_start, shard_end)
+
+
+class Checkpoint:
+    """Append-only JSON-lines file of finished shards and their parsed hits.
+
+    Only byte offsets are kept in memory; hits are read back per shard.
+    A line cut short by a crash is dropped when the file is opened.
+    """
+
+    def __init__(self, path="search_checkpoint.ndjson"):
+        self.path = path
+        self.offsets = {}
+
+        good = 0
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self.offsets[(entry["term"], entry["start"], entry["end"])] = good
+                    good += len(line)
+
+        self.file = open(path, "ab")
+        self.file.truncate(good)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def get(self, key):
+        with open(self.path, "rb") as file:
+            file.seek(self.offsets[key])
+            return json.loads(file.readline())["hits"]
+
+    def mark(self, key, hits):
+        term, start, end = key
+        if date.fromisoformat(end) >= date.today():
+            return
+        self.file.seek(0, os.SEEK_END)
+        offset = self.file.tell()
+        self.file.write(json.dumps({"term": term, "start": start, "end": end, "hits": hits}).encode() + b"\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.offsets[key] = offset
+
+    def close(self):
+        self.file.close()
+
+
+def fetch_and_parse(fetcher, jobs, parse=parse_drudge):
+    """`(key, hits)` for `(key, url)` jobs, fetched concurrently by
+    `fetcher` and yielded in job order; failed fetches are reported and
+    skipped."""
+    jobs = list(jobs)
+    done = {}
+    position = 0
+    for index, url, html, error in fetcher.fetch_all([url for _, url in jobs]):
+        if error:
+            print(f"skipping {url}: {error}")
+        done[index] = None if error else parse(html)
+        while position in done:
+            hits = done.pop(position)
+            if hits is not None:
+                yield jobs[position][0], hits
+            position += 1
+
+
+def resume(jobs, checkpoint, run):
+    """`(key, hits)` for every job, in order.  Checkpointed shards are read
+    back; the rest go through `run` (which takes the missing `(key, url)`
+    jobs and yields `(key, hits)` in their order, skipping failures) and
+    are checkpointed as they come.  Failed shards are left for the next
+    run."""
+    jobs = list(jobs)
+    fresh = iter(run([job for job in jobs if job[0] not in checkpoint]))
+    pending = next(fresh, None)
+    for key, _ in jobs:
+        if key in checkpoint:
+            yield key, checkpoint.get(key)
+        elif pending is not None and pending[0] == key:
+            checkpoint.mark(key, pending[1])
+            yield pending
+            pending = next(fresh, None)
@@ -0,0 +1,210 @@
+"""Streaming record writers.
+
+Records are written as they are produced instead of collected into one
+list and `json.dump`ed at the end:
+
+* `NdjsonWriter`: one JSON object per line, flushed every `flush_every`
+  records or `flush_seconds`, so a crash loses at most the last few
+* `ParquetSink`: buffered into row groups of `row_group_size` with a fixed
+  schema; sha256 `hash` stored as 32 raw bytes, `archive_date` /
+  `query_name` / `archive_url` dictionary encoded, zstd compressed.  The
+  footer is written on `close`, so it is the compact, columnar copy and
+  the NDJSON file is the crash-safe one.
+"""
+import json
+import time
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def schemas():
+    import pyarrow as pa
+
+    label_score = pa.struct([("label", pa.string()), ("score", pa.float64())])
+    vader_scores = pa.struct([(name, pa.float64()) for name in ("neg", "neu", "pos", "compound")])
+    return {
+        # search hits, as built by SeenRegistry.add and scored
+        "SEARCH_SCHEMA": pa.schema([
+            ("headline", pa.string()),
+            ("article_url", pa.string()),
+            ("archive_date", pa.dictionary(pa.int32(), pa.string())),
+            ("edition_time", pa.string()),
+            ("archive_url", pa.string()),
+            ("query_name", pa.dictionary(pa.int32(), pa.string())),
+            ("query_names", pa.list_(pa.string())),
+            ("emotion", pa.list_(label_score)),
+            ("scores", vader_scores),
+            ("hash", pa.binary(32)),
+            ("scraped_at", pa.timestamp("us")),
+        ]),
+        # archived edition stories, one row per story, tagged with their edition
+        "STORY_SCHEMA": pa.schema([
+            ("archive_url", pa.dictionary(pa.int32(), pa.string())),
+            ("headline", pa.string()),
+            ("url", pa.string()),
+            ("column", pa.int8()),
+            ("archive_date", pa.dictionary(pa.int32(), pa.string())),
+            ("hash", pa.binary(32)),
+            ("scraped_at", pa.timestamp("us")),
+        ]),
+        # entity -> (hash, archive_date), from entities.entity_rows
+        "ENTITY_SCHEMA": pa.schema([
+            ("entity", pa.dictionary(pa.int32(), pa.string())),
+            ("label", pa.dictionary(pa.int32(), pa.string())),
+            ("hash", pa.binary(32)),
+            ("archive_date", pa.dictionary(pa.int32(), pa.string())),
+        ]),
+    }
+
+
+def __getattr__(name):
+    # SEARCH_SCHEMA / STORY_SCHEMA / ENTITY_SCHEMA are built on first use,
+    # so NDJSON-only callers never import pyarrow
+    if name in ("SEARCH_SCHEMA", "STORY_SCHEMA", "ENTITY_SCHEMA"):
+        return schemas()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class NdjsonWriter:
+
+    def __init__(self, path, flush_every=500, flush_seconds=5.0, mode="w"):
+        # mode="a" adds to an existing file (a run that only writes what a
+        # persisted registry hasn't seen must not truncate the earlier records)
+        self.file = open(path, mode, encoding="utf-8")
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False))
+        self.file.write("\n")
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        self.file.flush()
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_ndjson(path):
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_parquet(records, out, schema, key=None):
+    """Copy the NDJSON file `records` to Parquet at `out`.  With `key`, a
+    record written again (same `record[key]`) replaces its earlier lines:
+    search records are re-emitted as they pick up query_names, and only
+    their last line belongs in the table."""
+    keep = None
+    if key is not None:
+        latest = {}
+        for line, record in enumerate(read_ndjson(records)):
+            latest[record[key]] = line
+        keep = set(latest.values())
+
+    with ParquetSink(out, schema) as sink:
+        for line, record in enumerate(read_ndjson(records)):
+            if keep is None or line in keep:
+                sink.write(record)
+
+
+def to_arrow(values, kind):
+    import pyarrow as pa
+
+    if pa.types.is_dictionary(kind):
+        return pa.array(values, kind.value_type).dictionary_encode()
+    if pa.types.is_fixed_size_binary(kind):
+        values = [None if v is None else bytes.fromhex(v) for v in values]
+    elif pa.types.is_timestamp(kind):
+        values = [None if v is None else datetime.fromisoformat(v) for v in values]
+    return pa.array(values, kind)
+
+
+class Tee:
+    """Several writers behind one `write`, e.g. NDJSON plus Parquet."""
+
+    def __init__(self, *writers):
+        self.writers = writers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        for writer in self.writers:
+            writer.write(record)
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def close(self):
+        for writer in self.writers:
+            writer.close()
+
+
+class ParquetSink:
+
+    def __init__(self, path, schema=None, row_group_size=10_000, compression="zstd"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.schema = schema if schema is not None else schemas()["SEARCH_SCHEMA"]
+        self.row_group_size = row_group_size
+        self.rows = []
+        dictionary = [field.name for field in self.schema if pa.types.is_dictionary(field.type)]
+        self.writer = pq.ParquetWriter(path, self.schema, compression=compression, use_dictionary=dictionary)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        import pyarrow as pa
+
+        if not self.rows:
+            return
+        arrays = [to_arrow([row.get(field.name) for row in self.rows], field.type) for field in self.schema]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,66 @@
+import json
+import sqlite3
+
+from drudge.loader import SqliteLoader
+
+
+def record(hash_, headline, query, scraped_at):
+    return {
+        "hash": hash_,
+        "headline": headline,
+        "article_url": f"https://example.com/{hash_}",
+        "archive_date": "February 28, 2026",
+        "edition_time": "18:06:39",
+        "archive_url": "https://www.drudgereportarchives.com/data/2026/02/28/20260228_180639.htm",
+        "query_name": query,
+        "query_names": [query],
+        "scraped_at": scraped_at,
+    }
+
+
+def load(path, records):
+    loader = SqliteLoader(path)
+    try:
+        return loader.load(records)
+    finally:
+        loader.close()
+
+
+def rows(path):
+    db = sqlite3.connect(path)
+    try:
+        return {hash_: (headline, json.loads(names), scraped_at) for hash_, headline, names, scraped_at in
+                db.execute("SELECT hash, headline, query_names, scraped_at FROM headlines")}
+    finally:
+        db.close()
+
+
+def test_reloading_upserts_one_row_per_hash(tmp_path):
+    path = str(tmp_path / "headlines.sqlite")
+    first = [record("a" * 64, "Old headline", "moon", "2026-03-01T10:00:00"),
+             record("b" * 64, "Other story", "moon", "2026-03-01T10:00:00")]
+    second = [record("a" * 64, "New headline", "nasa", "2026-03-02T10:00:00"),
+              record("b" * 64, "Other story", "moon", "2026-03-02T10:00:00")]
+
+    assert load(path, first) == 2
+    assert load(path, second) == 2
+
+    loaded = rows(path)
+    assert sorted(loaded) == ["a" * 64, "b" * 64]
+    headline, names, scraped_at = loaded["a" * 64]
+    assert headline == "New headline"
+    assert scraped_at == "2026-03-02T10:00:00"
+    assert sorted(names) == ["moon", "nasa"]
+    assert loaded["b" * 64][1] == ["moon"]
+
+
+def test_older_scrape_does_not_win(tmp_path):
+    path = str(tmp_path / "headlines.sqlite")
+    load(path, [record("a" * 64, "New headline", "nasa", "2026-03-02T10:00:00")])
+    load(path, [record("a" * 64, "Old headline", "moon", "2026-03-01T10:00:00")])
+
+    headline, names, scraped_at = rows(path)["a" * 64]
+    assert headline == "New headline"
+    assert scraped_at == "2026-03-02T10:00:00"
+    # tags still merge from the older load
+    assert sorted(names) == ["moon", "nasa"]
@@ -1,21 +1,10 @@
-
-import requests
-from bs4 import BeautifulSoup, Comment
-import re 
-from datetime import datetime
-from rapidfuzz import fuzz 
-import hashlib
 from pprint import pprint
-import json
 
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-analyzer = SentimentIntensityAnalyzer()
-from transformers import pipeline
+from drudge.scoring import Scorer
 
-emotion = pipeline(
-    "text-classification",
-    model="j-hartmann/emotion-english-distilroberta-base"
-) 
+# the rest of drudge (and the models, which only load when a headline isn't in
+# the score cache yet) is imported when the walkthrough actually runs, below;
+# `python -m drudge` runs the same stages one command at a time
 
 # def normalize_headline(text: str) -> str:
 #     # text = text.lower()
@@ -24,82 +13,25 @@ emotion = pipeline(
 #     # text = re.sub(r'\s+', ' ', text)
 #     return text.strip()  
  
-def parse_drudge(html):
-
-    soup = BeautifulSoup(html, "html.parser")
-    results = []
-
-    blocks = soup.find_all("p", style="margin-bottom:4px;")
-
-    for block in blocks:
-
-        strong = block.find("strong")
-        if not strong:
-            continue
-
-        link = strong.find("a")
-        if not link: continue 
-        headline = link.get_text(strip=True)
-        article_url = link["href"]
-
-        meta = block.find_next(string=re.compile("From the"))
-        if not meta:
-            continue
-
-        archive_link = meta.find_next("a")
-        archive_date = "" 
-        edition_time = "" 
-        archive_url = "" 
-        if archive_link: 
-            archive_date = archive_link.get_text(strip=True) 
-            archive_url = archive_link["href"] 
-
-            if archive_link.parent: 
-                full_text = archive_link.parent.get_text(" ", strip=True)
-
-                time_match = re.search(r"(\d{2}:\d{2}:\d{2})", full_text)
-                edition_time = time_match.group(1) if time_match else None
-
-        results.append({
-            "headline": headline,
-            "article_url": article_url,
-            "archive_date": archive_date,
-            "edition_time": edition_time,
-            "archive_url": archive_url,
-        })
-
-    return results 
-
-
-def process_results(results, query_name): 
-    result_array = [] 
-    seen_headlines = set()  
-    seen_urls = set() 
-
-    for item in results: 
-        headline = (item['headline']) 
-        article_url = item['article_url']  
-
-        if article_url not in seen_urls:
-            seen_urls.add(article_url)
-
-            found = False 
-            for seen_headline in seen_headlines:   
-                if fuzz.token_set_ratio(seen_headline, headline) >= 95: 
-                    found = True
-                    break 
-            
-            if not found:   
-                item["query_name"] = query_name
-                item["emotion"] = emotion(headline)
-                item["scores"] = analyzer.polarity_scores(headline) 
-                item["hash"] = hashlib.sha256(headline.encode()).hexdigest()
-                item["scraped_at"] = datetime.utcnow().isoformat() 
-                result_array.append(item) 
-                seen_headlines.add(headline)
-                seen_urls.add(item['article_url']) 
-
-    return result_array
+def process_results(results, query_name, scorer, registry=None): 
+    """New (scored) records for `query_name`, then the records already kept
+    under other queries that now also carry `query_name` in `query_names`.
+    `registry` is the SeenRegistry shared by a run's queries; by default
+    every call starts fresh."""
+    if registry is None:
+        from drudge.dedup import SeenRegistry
+
+        registry = SeenRegistry()
+
+    # seen urls, normalized headlines and the fuzzy check (token_set_ratio >= 95)
+    # are shared by every query, so a story is only scored under the first one
+    result_array, retagged = registry.add(query_name, results)
+
+    # cached scores are reused; the models only see headlines not scored before
+    # (and the emotion model sees all of those in one batched pass)
+    scorer(result_array)
+
+    return result_array + retagged
   
 #######################################################################
 # known limitation on data cleansing: 
@@ -127,135 +59,128 @@ def process_results(results, query_name):
 # proper nouns or whatever.  See if the Moon, NASA brings in tides and 
 # consipiracy theories 
 
-results_array = [] 
-
-# Drudge Report for "Conspiracy Theor" for 2024-03-01 to current day: 
-url = 'https://www.drudgereportarchives.com/dsp/search.htm?searchFor=conspiracy+theor&searchStartDate=2024-03-01&searchEndDate=2026-03-01'  
-
-response = requests.get(url) 
-results = parse_drudge(response.text)
-results_array += process_results(results, "conspiracy theor")
-
-# Drudge Report for "Moon" for 2024-03-01 to current day: 
-url = 'https://www.drudgereportarchives.com/dsp/search.htm?searchFor=moon&searchStartDate=2024-03-01&searchEndDate=2026-03-01' 
- 
-response = requests.get(url) 
-
-results = parse_drudge(response.text)
-results_array += process_results(results, "moon")
-
-# Drudge Report for "NASA" for 2024-03-01 to current day: 
-url = 'https://www.drudgereportarchives.com/dsp/search.htm?searchFor=nasa&searchStartDate=2024-03-01&searchEndDate=2026-03-01'  
- 
-response = requests.get(url)
- 
-results = parse_drudge(response.text)
-results_array += process_results(results, "nasa")
-
-
-import json 
-with open("output.json", 'w') as file:
-    json.dump(results_array, file, indent=4)
- 
-
-#######################################################################
-# and then...
-#######################################################################
-# I want put this data in postgres (because I know how to use it with 
-# datagrip) and really analyze it to see if I can find any trends it it.
-# With my silly idea of Moon vs Conspiracy Theories it is sort of psuedo
-# science but I wanted to get off the easy buzzwords of poltics,
-# religion, etc.  
-
-
-
-
-#######################################################################
-# after thoughts
-#######################################################################
-# At least up until a certain time frame, it does allow you to look at the 
-# day of data you collected by an archive_url.  That might be easer to cross
-# list or find common keywords for.  That is the next real adventure - 
-# guessing what might add up or letting the data tell you for you.  I don't
-# want to go any further (and hopefully this demonstrated enough...) but
-# as a demo.... again, here we have the druge report for "moon"
-
-# Drudge Report for "Moon" for 2024-03-01 to current day: 
-url = 'https://www.drudgereportarchives.com/dsp/search.htm?searchFor=moon&searchStartDate=2024-03-01&searchEndDate=2026-03-01'  
-
-results_array = [] 
-
-response = requests.get(url)  
-results = parse_drudge(response.text)
-results_array += process_results(results, "moon")
-
-
-stories_days = [] 
-
-for a in results_array: 
-    url = a["archive_url"] 
-    response = requests.get(url)   
-    soup = BeautifulSoup(response.text, "html.parser")
- 
-
-    main_block = soup.find("div", id="DR-HU-MAIN")
-    main_headlines = []
-
-    if not main_block: continue 
-
-    # this shows as an error down here but runs fine 
-    for aa in main_block.find_all("a", href=True):
-        text = aa.get_text(strip=True) 
-
-        if text:
-            main_headlines.append({
-                "headline": text,
-                "url": aa["href"],
-                "scraped_at": datetime.utcnow().isoformat(),
-                "archive_date": a["archive_date"] # TODO: FIX THIS whole situation 
-            }) 
-  
-    # this shows as an error down here but runs fine 
-    headline_table = main_block.find_next("table")
-    columns = headline_table.find_all("td", width="33%")
-    def looks_like_story(text):
-        if not text:
-            return False
-        if len(text) < 25:
-            return False
-        if "EMAIL:" in text: 
-            return False 
-        return True
-
-
-    stories = []
-
-    for col_index, col in enumerate(columns):
-
-        for aa in col.find_all("a", href=True):
-            text = aa.get_text(" ", strip=True)
-
-            if looks_like_story(text):
-                stories.append({
-                    "headline": text,
-                    "url": aa["href"],
-                    "column": col_index,
-                    "archive_date": a["archive_date"],
-                    "hash": hashlib.sha256(text.encode()).hexdigest(),
-                    "scraped_at": datetime.utcnow().isoformat()  
-                })
-
-    stories_days.append(stories)
-
-import json 
-with open("output_daily_historic_view.json", 'w') as file:
-    json.dump(stories_days, file, indent=4)
-pprint(stories_days) 
- 
- 
-#######################################################################
-# Now I want to isolate proper or important nouns, let's at least 
-# remove a lot of those extra words, I guess...
-#######################################################################
-# but I will stop here since this requires more eyes than mine if it 
-# will be for a group  
\ No newline at end of file
+if __name__ == "__main__":
+    from drudge.archive import ArchiveStage
+    from drudge.dedup import SeenRegistry
+    from drudge.emotion import make_classifier
+    from drudge.entities import EntityStage, entity_rows
+    from drudge.fetch import Fetcher
+    from drudge.pagestore import PageStore
+    from drudge.scorecache import ScoreCache
+    from drudge.shards import Checkpoint, fetch_and_parse, resume, shard_jobs
+    from drudge.writers import ENTITY_SCHEMA, SEARCH_SCHEMA, STORY_SCHEMA, NdjsonWriter, ParquetSink, Tee, export_parquet
+
+    # scores keyed by headline hash + model, so re-runs only score new headlines;
+    # the emotion model loads on first use and scores headlines in batches
+    # ("onnx" runs it through ONNX Runtime, int8, on CPU; check its labels
+    # against the pipeline with `python -m drudge.emotion parity`)
+    EMOTION_BACKEND = "transformers"
+    scorer = Scorer(ScoreCache("scores.sqlite", max_entries=2_000_000),
+                    make_classifier(EMOTION_BACKEND, batch_size=32))
+
+    # one keep-alive session with timeouts, retries and per-host politeness;
+    # archive editions are kept on disk for good, search pages for an hour
+    # (OFFLINE = True re-runs everything from the page store only)
+    OFFLINE = False
+    fetcher = Fetcher(max_workers=8, per_host=4, min_interval=0.25,
+                      store=PageStore("pages", ttl=3600), offline=OFFLINE)
+
+    # one registry for all three queries: a story found by several of them is one
+    # record tagged with each query_name (set REGISTRY_PATH to keep it across runs).
+    # When a later query tags a record it is written again with the longer
+    # query_names; the loader and the Parquet export keep one row per hash.
+    REGISTRY_PATH = None
+    registry = SeenRegistry.open(REGISTRY_PATH)
+
+    # records are written as each search shard finishes (the NDJSON file is flushed as
+    # it goes); the Parquet file is the compact columnar copy, made from it at the end.
+    # A kept registry means a rerun only writes records it hasn't seen, so the file
+    # is appended to rather than started over
+    output = NdjsonWriter("output.ndjson", mode="a" if REGISTRY_PATH else "w")
+
+    # Drudge Report for "Conspiracy Theor", "Moon" and "NASA" for 2024-03-01 to
+    # current day, searched a month at a time: the month shards are fetched
+    # concurrently and each finished one is kept in search_checkpoint.ndjson, so
+    # an interrupted (or extended) run only fetches the months it is missing
+    TERMS = ["conspiracy theor", "moon", "nasa"]
+    checkpoint = Checkpoint("search_checkpoint.ndjson")
+
+    def search(terms, start="2024-03-01", end="2026-03-01"):
+        return resume(shard_jobs(terms, start, end, by="month"), checkpoint,
+                      lambda jobs: fetch_and_parse(fetcher, jobs))
+
+    for (term, shard_start, shard_end), results in search(TERMS):
+        output.write_many(process_results(results, term, scorer, registry))
+
+    output.close()
+    export_parquet("output.ndjson", "output.parquet", SEARCH_SCHEMA, key="hash")
+    if REGISTRY_PATH:
+        registry.save(REGISTRY_PATH)
+
+
+    #######################################################################
+    # and then...
+    #######################################################################
+    # I want put this data in postgres (because I know how to use it with 
+    # datagrip) and really analyze it to see if I can find any trends it it.
+    # With my silly idea of Moon vs Conspiracy Theories it is sort of psuedo
+    # science but I wanted to get off the easy buzzwords of poltics,
+    # religion, etc.  
+    #
+    # -> python -m drudge load output.ndjson --target postgresql://localhost/drudge
+    #    (or without a server: python -m drudge load output.ndjson)
+
+
+
+
+    #######################################################################
+    # after thoughts
+    #######################################################################
+    # At least up until a certain time frame, it does allow you to look at the 
+    # day of data you collected by an archive_url.  That might be easer to cross
+    # list or find common keywords for.  That is the next real adventure - 
+    # guessing what might add up or letting the data tell you for you.  I don't
+    # want to go any further (and hopefully this demonstrated enough...) but
+    # as a demo.... again, here we have the druge report for "moon"
+
+    # Drudge Report for "Moon" for 2024-03-01 to current day (the month shards
+    # come straight back out of the checkpoint):
+    results_array = [] 
+
+    moon_registry = SeenRegistry()  # its own registry: every moon hit
+    for _, results in search(["moon"]):
+        results_array += process_results(results, "moon", scorer, moon_registry)
+
+
+    # each edition is fetched and parsed once, however many hits point at it,
+    # and pages are parsed as they arrive from the pooled, polite fetcher;
+    # stories are written (and handed on to the entity stage below) edition
+    # by edition instead of after the whole archive run
+    archive = ArchiveStage(fetcher)
+
+    def archived(output):
+        for archive_url, stories in archive.stream(results_array):
+            if stories is not None:
+                pprint(stories)
+            for story in stories or ():
+                story = {"archive_url": archive_url, **story}
+                output.write(story)
+                yield story
+
+
+    #######################################################################
+    # Now I want to isolate proper or important nouns, let's at least 
+    # remove a lot of those extra words, I guess...
+    #######################################################################
+    # but I will stop here since this requires more eyes than mine if it 
+    # will be for a group
+
+    # spaCy NER (tok2vec + ner only) over the stories, in worker processes,
+    # cached per headline hash next to the scores; one row per entity per
+    # story, with its hash and archive date.  It pulls stories straight from
+    # the archive stream, so it runs while editions are still being fetched
+    with Tee(NdjsonWriter("output_daily_historic_view.ndjson"),
+             ParquetSink("output_daily_historic_view.parquet", STORY_SCHEMA)) as output, \
+            EntityStage(scorer.score_cache) as entities, ParquetSink("entities.parquet", ENTITY_SCHEMA) as table:
+        for story, found in entities.run(archived(output)):
+            table.write_many(entity_rows(story, found))
@@ -0,0 +1,459 @@
+"""Benchmarks for the week04 weather pipeline.
+
+    python bench.py handoff --sites 300 --days 1826
+    python bench.py pipeline --sites 300 --days 1826 --variables 11
+    python bench.py pipeline --save baseline.json
+    python bench.py pipeline --baseline baseline.json --max-slowdown 1.2
+    python bench.py failures
+
+`failures` checks that a location the endpoint keeps refusing ends up in
+`fetch_daily_concurrent`'s failures while the rest of the run completes.
+
+`pipeline` drives ingest -> decode -> frame -> aggregation against a local
+fake Open-Meteo endpoint that answers with synthetic FlatBuffers, so
+nothing touches the live API.  Each measured path runs in its own spawned
+process so peak RSS numbers don't bleed into each other.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import traceback
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from registry import Site
+from weather import DAILY, MAX_LOCATIONS_PER_CALL, arrow_schema, chunked, decode_columns, fetch_chunk, frame_from_columns, locations, state_codes
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize() / 2**20
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def isolated(target, *args):
+    """Run `target(*args)` in a fresh spawned process and return its result."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(target, args)
+
+
+################################################################################################
+# synthetic data
+################################################################################################
+
+# a few states, so the aggregation's state grouping has something to do
+STATES = ["MO", "KS", "IL"]
+
+def synthetic_columns(sites, days, variables=DAILY, seed=0):
+    rng = np.random.default_rng(seed)
+    start = int(pd.Timestamp("2021-01-01", tz = "UTC").timestamp())
+    seconds = np.tile(start + 86400 * np.arange(days, dtype = np.int64), sites)
+    codes = np.repeat(np.arange(sites, dtype = np.int32), days)
+    enrollment = np.repeat(rng.integers(2_000, 60_000, sites).astype(np.int32), days)
+    columns = {name: rng.normal(30, 15, sites * days).astype(np.float32) for name in variables}
+    names = [f"University {i}" for i in range(sites)]
+    states = [STATES[i % len(STATES)] for i in range(sites)]
+    return seconds, codes, names, states, enrollment, columns
+
+
+def legacy_frame(sites, days):
+    """The frame the original script handed Spark: object `source` strings,
+    tz-aware ns timestamps and a broadcast Python int enrollment."""
+    seconds, codes, names, states, enrollment, columns = synthetic_columns(sites, days)
+    return pd.DataFrame({
+        "date": pd.to_datetime(seconds, unit = "s", utc = True),
+        "source": np.array(names, dtype = object)[codes],
+        "state": np.array(states, dtype = object)[codes],
+        "enrollment": enrollment.astype(np.int64),
+        **columns,
+    })
+
+
+def arrow_table(sites, days):
+    seconds, codes, names, states, enrollment, columns = synthetic_columns(sites, days)
+    state, state_values = state_codes(codes, states)
+    return pa.Table.from_arrays([
+        pa.array(seconds, type = pa.timestamp("s", tz = "UTC")),
+        pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(names)),
+        pa.DictionaryArray.from_arrays(pa.array(state), pa.array(state_values)),
+        pa.array(enrollment),
+        *[pa.array(columns[name]) for name in DAILY],
+    ], schema = arrow_schema(DAILY))
+
+
+################################################################################################
+# pandas -> Spark vs Arrow -> Spark
+################################################################################################
+
+def handoff_trial(path, sites, days):
+    from pyspark.sql import SparkSession
+
+    from severe import arrow_to_spark
+
+    spark = SparkSession.builder.master("local[*]").appName("handoff-bench").getOrCreate()
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+
+    data = legacy_frame(sites, days) if path == "pandas" else arrow_table(sites, days)
+    baseline = current_rss_mb()
+
+    started = time.perf_counter()
+    if path == "pandas":
+        spark_df = spark.createDataFrame(data)
+    else:
+        spark_df = arrow_to_spark(spark, data)
+    converted = time.perf_counter()
+    rows = spark_df.count()
+    counted = time.perf_counter()
+
+    spark.stop()
+    return {
+        "path": path,
+        "rows": rows,
+        "create_s": round(converted - started, 3),
+        "create_and_count_s": round(counted - started, 3),
+        "driver_peak_rss_mb": round(peak_rss_mb(), 1),
+        "driver_rss_over_input_mb": round(peak_rss_mb() - baseline, 1),
+    }
+
+
+def bench_handoff(args):
+    results = [isolated(handoff_trial, path, args.sites, args.days) for path in ("pandas", "arrow")]
+    for result in results:
+        print(json.dumps(result))
+    pandas, arrow = results
+    print(f"arrow hand-off: {pandas['create_s'] / max(arrow['create_s'], 1e-9):.1f}x faster to create, "
+          f"{pandas['driver_rss_over_input_mb'] - arrow['driver_rss_over_input_mb']:+.0f} MB less driver memory")
+    return results
+
+
+################################################################################################
+# local Open-Meteo stand-in
+################################################################################################
+
+# Field slots from the openmeteo_sdk schema.  Its runtime modules only ship
+# readers (the *Start/*Add builder helpers exist in the .pyi stubs alone),
+# so responses are built with the raw flatbuffers.Builder API.
+VALUES_SLOT = 3                                                       # VariableWithValues
+TIME_SLOT, TIME_END_SLOT, INTERVAL_SLOT, VARIABLES_SLOT = 0, 1, 2, 3  # VariablesWithTime
+LATITUDE_SLOT, LONGITUDE_SLOT, ELEVATION_SLOT = 0, 1, 2               # WeatherApiResponse
+DAILY_SLOT, HOURLY_SLOT = 10, 11
+
+
+def encode_response(latitude, longitude, start, steps, interval, variables, resolution, rng):
+    """One size-prefixed WeatherApiResponse message, as the real API sends it."""
+    import flatbuffers
+
+    builder = flatbuffers.Builder(1024 + steps * len(variables) * 4)
+
+    offsets = []
+    for _ in variables:
+        values = builder.CreateNumpyVector(rng.normal(30, 15, steps).astype(np.float32))
+        builder.StartObject(VALUES_SLOT + 1)
+        builder.PrependUOffsetTRelativeSlot(VALUES_SLOT, values, 0)
+        offsets.append(builder.EndObject())
+
+    builder.StartVector(4, len(offsets), 4)
+    for offset in reversed(offsets):
+        builder.PrependUOffsetTRelative(offset)
+    vector = builder.EndVector()
+
+    builder.StartObject(VARIABLES_SLOT + 1)
+    builder.PrependInt64Slot(TIME_SLOT, start, 0)
+    builder.PrependInt64Slot(TIME_END_SLOT, start + steps * interval, 0)
+    builder.PrependInt32Slot(INTERVAL_SLOT, interval, 0)
+    builder.PrependUOffsetTRelativeSlot(VARIABLES_SLOT, vector, 0)
+    block = builder.EndObject()
+
+    builder.StartObject(HOURLY_SLOT + 1)
+    builder.PrependFloat32Slot(LATITUDE_SLOT, latitude, 0.0)
+    builder.PrependFloat32Slot(LONGITUDE_SLOT, longitude, 0.0)
+    builder.PrependFloat32Slot(ELEVATION_SLOT, 200.0, 0.0)
+    builder.PrependUOffsetTRelativeSlot(HOURLY_SLOT if resolution == "hourly" else DAILY_SLOT, block, 0)
+    builder.FinishSizePrefixed(builder.EndObject())
+    return bytes(builder.Output())
+
+
+class FakeOpenMeteo(BaseHTTPRequestHandler):
+    """Answers any GET like the forecast/archive endpoints: one synthetic
+    response per requested location.  `latency` (seconds) is added per
+    request to stand in for the real round trip; a request for any
+    `(latitude, longitude)` in `refused` gets a 500."""
+
+    latency = 0.0
+    refused = frozenset()
+
+    def do_GET(self):
+        try:
+            status, content_type, body = 200, "application/octet-stream", self.respond()
+        except Exception:
+            # say what broke instead of dropping the connection
+            status, content_type = 500, "text/plain; charset=utf-8"
+            body = traceback.format_exc().encode()
+
+        time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def respond(self):
+        query = parse_qs(urlsplit(self.path).query)
+
+        def listed(key):
+            return [item for value in query.get(key, []) for item in value.split(",") if item]
+
+        resolution = "hourly" if "hourly" in query else "daily"
+        variables = listed(resolution)
+        first = date.fromisoformat(query["start_date"][0])
+        last = date.fromisoformat(query["end_date"][0])
+        days = (last - first).days + 1
+        interval = 3600 if resolution == "hourly" else 86400
+        steps = days * 24 if resolution == "hourly" else days
+        start = int(pd.Timestamp(first, tz = "UTC").timestamp())
+
+        points = [(float(lat), float(lon)) for lat, lon in zip(listed("latitude"), listed("longitude"))]
+        if self.refused.intersection(points):
+            raise ValueError(f"refusing {sorted(self.refused.intersection(points))}")
+
+        rng = np.random.default_rng(abs(hash(self.path)) % 2**32)
+        return b"".join(
+            encode_response(lat, lon, start, steps, interval, variables, resolution, rng)
+            for lat, lon in points
+        )
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port_queue, latency, refused):
+    FakeOpenMeteo.latency = latency
+    FakeOpenMeteo.refused = frozenset(refused)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenMeteo)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def fake_open_meteo(latency=0.0, refused=()):
+    """Run the stand-in in its own process (so encoding doesn't share our
+    GIL) and yield its base URL."""
+    ctx = multiprocessing.get_context("spawn")
+    port_queue = ctx.Queue()
+    server = ctx.Process(target = serve, args = (port_queue, latency, list(refused)), daemon = True)
+    server.start()
+    try:
+        yield f"http://127.0.0.1:{port_queue.get(timeout = 30)}/v1/forecast"
+    finally:
+        server.terminate()
+        server.join()
+
+
+################################################################################################
+# ingest -> aggregate pipeline
+################################################################################################
+
+def synthetic_sites(count):
+    rng = np.random.default_rng(1)
+    return [
+        Site(source = f"University {i}", state = STATES[i % len(STATES)], enrollment = int(rng.integers(2_000, 60_000)),
+             latitude = round(25 + (i // 100) * 0.25, 4), longitude = round(-120 + (i % 100) * 0.5, 4))
+        for i in range(count)
+    ]
+
+
+def bench_variables(count):
+    return DAILY[:count] + [f"extra_{i}" for i in range(count - len(DAILY))]
+
+
+def legacy_site_frame(response, site, variables):
+    """The original per-site block: dict of arrays + broadcast scalars."""
+    daily = response.Daily()
+    daily_data = {"date": pd.date_range(
+        start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
+        end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
+        freq = pd.Timedelta(seconds = daily.Interval()),
+        inclusive = "left"
+    )}
+    daily_data["source"] = site.source
+    daily_data["state"] = site.state
+    daily_data["enrollment"] = site.enrollment
+    for i, name in enumerate(variables):
+        daily_data[name] = daily.Variables(i).ValuesAsNumpy()
+    return pd.DataFrame(data = daily_data)
+
+
+def pipeline_trial(url, site_count, days, variable_count, backend, legacy):
+    import openmeteo_requests
+    import requests
+
+    from severe import run_severe_weather
+
+    sites = synthetic_sites(site_count)
+    variables = bench_variables(variable_count)
+    start_date = date(2021, 1, 1)
+    end_date = start_date + timedelta(days = days - 1)
+
+    # no cache: every run pays the full (local) round trip
+    client = openmeteo_requests.Client(session = requests.Session())
+    timings = {}
+
+    @contextlib.contextmanager
+    def stage(name):
+        started = time.perf_counter()
+        yield
+        timings[name] = round(time.perf_counter() - started, 4)
+
+    with stage("network"):
+        pairs = []
+        for chunk in chunked(locations(sites), MAX_LOCATIONS_PER_CALL):
+            pairs += fetch_chunk(client, chunk, start_date.isoformat(), end_date.isoformat(), variables, url)
+
+    if legacy:
+        timings["decode"] = 0.0
+        with stage("frame_build"):
+            frames = [legacy_site_frame(response, site, variables) for site, response in pairs]
+        with stage("concat"):
+            frame = pd.concat(frames)
+    else:
+        with stage("decode"):
+            columns = decode_columns(pairs, variables)
+        with stage("frame_build"):
+            frame = frame_from_columns(*columns)
+        timings["concat"] = 0.0
+
+    if set(DAILY) <= set(variables):
+        with stage("aggregation"):
+            run_severe_weather(frame, backend = backend, start_date = start_date.isoformat())
+    else:
+        timings["aggregation"] = None
+
+    total = sum(t for t in timings.values() if t)
+    return {
+        "sites": site_count,
+        "days": days,
+        "variables": len(variables),
+        "backend": backend,
+        "legacy": legacy,
+        "rows": len(frame),
+        "stages_s": timings,
+        "total_s": round(total, 4),
+        "rows_per_s": round(len(frame) / total) if total else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def regressions(result, baseline, max_slowdown):
+    """Stages (and the total) that got slower than `max_slowdown` x baseline."""
+    slower = []
+    stages = dict(result["stages_s"], total = result["total_s"])
+    before = dict(baseline["stages_s"], total = baseline["total_s"])
+    for name, seconds in stages.items():
+        # ignore stages too short to time reliably
+        if seconds and before.get(name) and before[name] >= 0.01 and seconds > before[name] * max_slowdown:
+            slower.append(f"{name}: {before[name]:.3f}s -> {seconds:.3f}s")
+    return slower
+
+
+def bench_pipeline(args):
+    with fake_open_meteo(args.latency) as url:
+        result = isolated(pipeline_trial, url, args.sites, args.days, args.variables, args.backend, args.legacy)
+    print(json.dumps(result, indent = 1))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(result, file, indent = 1)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            slower = regressions(result, json.load(file), args.max_slowdown)
+        for line in slower:
+            print(f"REGRESSION {line}")
+        if slower:
+            sys.exit(1)
+    return result
+
+
+################################################################################################
+# failure isolation in the concurrent ingest
+################################################################################################
+
+def check_failures(args):
+    import openmeteo_requests
+    import requests
+
+    from weather import fetch_daily_concurrent
+
+    sites = synthetic_sites(args.sites)
+    bad = sites[len(sites) // 2]
+
+    with fake_open_meteo(refused = [(bad.latitude, bad.longitude)]) as url:
+        # several windows, so failing chunks complete after healthy ones
+        frame, failures = fetch_daily_concurrent(
+            sites, "2021-01-01", "2021-01-20", url = url, window_days = 5, max_workers = 4,
+            requests_per_second = 0, client_factory = lambda: openmeteo_requests.Client(session = requests.Session()))
+
+    failed = {failure["source"] for failure in failures}
+    fetched = set(frame["source"].astype(str).unique())
+    print(f"{len(frame)} rows for {len(fetched)} sites, {len(failures)} failed (site, window) pairs")
+
+    problems = []
+    if failed != {bad.source}:
+        problems.append(f"expected only {bad.source} to fail, got {sorted(failed)}")
+    if len(failures) != 4:
+        problems.append(f"expected 4 failed windows for {bad.source}, got {len(failures)}")
+    if fetched != {site.source for site in sites} - {bad.source}:
+        problems.append("healthy sites are missing from the frame")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest = "command", required = True)
+
+    handoff = commands.add_parser("handoff", help = "pandas vs Arrow hand-off to Spark")
+    handoff.add_argument("--sites", type = int, default = 300)
+    handoff.add_argument("--days", type = int, default = 5 * 365)
+    handoff.set_defaults(run = bench_handoff)
+
+    pipeline = commands.add_parser("pipeline", help = "ingest -> aggregate against a local fake Open-Meteo")
+    pipeline.add_argument("--sites", type = int, default = 300)
+    pipeline.add_argument("--days", type = int, default = 5 * 365)
+    pipeline.add_argument("--variables", type = int, default = len(DAILY))
+    pipeline.add_argument("--backend", default = "auto", choices = ["auto", "duckdb", "pandas", "spark"])
+    pipeline.add_argument("--latency", type = float, default = 0.0, help = "seconds added per fake request")
+    pipeline.add_argument("--legacy", action = "store_true", help = "per-site dict frames + pd.concat, as originally written")
+    pipeline.add_argument("--save", help = "write the result here (e.g. a new baseline)")
+    pipeline.add_argument("--baseline", help = "fail if slower than this saved result")
+    pipeline.add_argument("--max-slowdown", type = float, default = 1.2)
+    pipeline.set_defaults(run = bench_pipeline)
+
+    failures = commands.add_parser("failures", help = "a refused location lands in failures, not an exception")
+    failures.add_argument("--sites", type = int, default = 250)
+    failures.set_defaults(run = check_failures)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+from weather import MAX_LOCATIONS_PER_CALL, URL, chunked, date_windows, fetch_chunk, locations, time_index
+
+
+# The order of variables in hourly or daily is important to assign them correctly below
+HOURLY = [
+    "temperature_2m",
+    "apparent_temperature",
+    "rain",
+    "snowfall",
+    "weather_code",
+]
+
+# WMO weather codes for freezing drizzle (56, 57) and freezing rain (66, 67)
+FREEZING_RAIN_CODES = np.array([56, 57, 66, 67], dtype = np.float32)
+
+FREEZING_F = 32.0
+
+
+################################################################################################
+# stage 1: stream (site, hours) blocks, one batched request per site chunk per window
+################################################################################################
+
+def hourly_blocks(client, sites, start_date, end_date, window_days=31, url=URL, chunk_size=MAX_LOCATIONS_PER_CALL):
+    """Yield `(site, seconds, values)` per site per date window, where
+    `values` maps each HOURLY variable to its float32 array.
+
+    Only one window of one site chunk is held at a time, so memory is
+    bounded by `window_days * chunk_size` hours rather than by history.
+    """
+    for start, end in date_windows(start_date, end_date, window_days):
+        for chunk in chunked(locations(sites), chunk_size):
+            for site, response in fetch_chunk(client, chunk, start, end, HOURLY, url, resolution = "hourly"):
+                hourly = response.Hourly()
+                seconds = time_index(hourly.Time(), hourly.TimeEnd(), hourly.Interval())
+                values = {name: hourly.Variables(i).ValuesAsNumpy() for i, name in enumerate(HOURLY)}
+                yield site, seconds, values
+
+
+################################################################################################
+# stage 2: vectorized indicators, rolled up to one row per day
+################################################################################################
+
+def daily_rollup(site, seconds, values):
+    """Collapse a block of hours (GMT days, as the API returns them) into
+    one row per day with the columns the severe weather aggregation reads
+    (temperature and apparent temperature max/min, snowfall_sum, rain_sum),
+    plus `freezing_rain_hours`: hours with a freezing rain/drizzle weather
+    code or rain while below freezing.  When that column is present the
+    aggregation flags freezing rain from it instead of the daily proxy
+    (rain on a day whose average is below freezing).  The other daily
+    variables (weather_code, showers, wind, precipitation_hours) are not
+    rolled up."""
+    days = len(seconds) // 24
+    hours = days * 24
+
+    def by_day(name):
+        return values[name][:hours].reshape(days, 24)
+
+    temperature = by_day("temperature_2m")
+    apparent = by_day("apparent_temperature")
+    rain = by_day("rain")
+    snowfall = by_day("snowfall")
+    code = by_day("weather_code")
+
+    freezing = temperature < FREEZING_F
+    freezing_rain = np.isin(code, FREEZING_RAIN_CODES) | ((rain > 0) & freezing)
+
+    return pd.DataFrame({
+        "date": pd.to_datetime(seconds[:hours:24], unit = "s", utc = True),
+        "source": site.source,
+        "state": site.state,
+        "enrollment": np.int32(site.enrollment),
+        "temperature_2m_max": np.nanmax(temperature, axis = 1),
+        "temperature_2m_min": np.nanmin(temperature, axis = 1),
+        "apparent_temperature_max": np.nanmax(apparent, axis = 1),
+        "apparent_temperature_min": np.nanmin(apparent, axis = 1),
+        "snowfall_sum": np.nansum(snowfall, axis = 1),
+        "rain_sum": np.nansum(rain, axis = 1),
+        "freezing_rain_hours": freezing_rain.sum(axis = 1, dtype = np.int16),
+    })
+
+
+################################################################################################
+# pipeline
+################################################################################################
+
+def hourly_daily_rollups(client, sites, start_date, end_date, window_days=31, url=URL):
+    """Generator of per-site, per-window daily rollup frames."""
+    for site, seconds, values in hourly_blocks(client, sites, start_date, end_date, window_days, url):
+        yield daily_rollup(site, seconds, values)
+
+
+def fetch_hourly_as_daily(client, sites, start_date, end_date, window_days=31, url=URL):
+    """Drive the hourly pipeline and keep only the (small) daily rollups."""
+    frame = pd.concat(hourly_daily_rollups(client, sites, start_date, end_date, window_days, url), ignore_index = True)
+    frame["source"] = frame["source"].astype("category")
+    frame["state"] = frame["state"].astype("category")
+    return frame
@@ -0,0 +1,48 @@
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+
+from weather import DAILY
+
+
+SITES_CSV = Path(__file__).with_name("sites.csv")
+
+# Named variable sets a site can ask for; sites sharing a set (and a date
+# range) share requests, so this is the only place a variable list lives
+VARIABLE_SETS = {
+    "severe": DAILY,
+}
+
+
+@dataclass(frozen = True, slots = True)
+class Site:
+    source: str
+    state: str
+    enrollment: int
+    latitude: float
+    longitude: float
+    variables: str = "severe"
+
+
+def load_sites(path=SITES_CSV):
+    """Read the site registry; adding a school is a new CSV row."""
+    with open(path, newline = "") as file:
+        return [
+            Site(
+                source = row["source"],
+                state = row["state"],
+                enrollment = int(row["enrollment"]),
+                latitude = float(row["latitude"]),
+                longitude = float(row["longitude"]),
+                variables = row.get("variables") or "severe",
+            )
+            for row in csv.DictReader(file)
+        ]
+
+
+def by_variable_set(sites):
+    """Group sites by variable set so each set is requested once."""
+    groups = {}
+    for site in sites:
+        groups.setdefault(site.variables, []).append(site)
+    return groups
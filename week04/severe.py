@@ -0,0 +1,359 @@
+import importlib.util
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+FREEZING_F = 32.0
+
+# Above this many input rows the aggregation is shipped to Spark (when a
+# session is available); below it an in-process engine is much faster than
+# JVM startup plus pandas -> Arrow -> Spark serialization.
+LOCAL_MAX_ROWS = 5_000_000
+
+# The few spots where Spark SQL and DuckDB disagree
+DIALECTS = {
+    "spark": {
+        "dow": "DATE_FORMAT(date, 'E')",
+        "severe_days": "collect_list(CASE WHEN {severe} THEN date_format(date, 'MM-dd') END)",
+    },
+    "duckdb": {
+        "dow": "strftime(date, '%a')",
+        "severe_days": "COALESCE(list(strftime(date, '%m-%d') ORDER BY date) FILTER (WHERE {severe}), [])",
+    },
+}
+
+
+def lookback_sql(lookback_days):
+    # Largest snowfall over the previous N calendar days of the same school.
+    # A RANGE frame is keyed on the date, so a school with missing days
+    # (a failed fetch window) never reaches back past them the way a row
+    # count would; it still stays inside one partition per school, so the
+    # engine sorts each partition once instead of shuffling a self-join.
+    return (f"MAX(snowfall_sum) OVER (PARTITION BY source ORDER BY date "
+            f"RANGE BETWEEN INTERVAL {lookback_days} DAYS PRECEDING AND INTERVAL 1 DAYS PRECEDING)")
+
+
+def severe_weather_sql(table="january_data", lookback_days=1, start_date="2026-01-01", dialect="spark", hourly=False):
+    """The severe weather aggregation as SQL over `table`, for Spark or DuckDB.
+
+    Snow "the day before" generalizes to snow on any of the previous
+    `lookback_days` calendar days of the same school (missing days count
+    as no snow).
+    The window runs before the school day / date filter so Monday still
+    sees Sunday's snow and the first day sees the day before `start_date`.
+    With `hourly` (rows from the hourly rollup) a freezing rain day is one
+    with any `freezing_rain_hours`, not rain on a below-freezing day.
+    """
+    sql = DIALECTS[dialect]
+    severe = "y.freezing_day = 1 or y.snow_day_or_before = 1 or y.freezing_rain_day = 1"
+    hourly_columns = ""
+    if hourly:
+        hourly_columns = """,
+
+            -- Freezing rain hours from the hourly rollup
+            freezing_rain_hours"""
+        freezing_rain = """-- Freezing rain/drizzle codes, or rain in an hour below freezing
+        CASE
+            WHEN freezing_rain_hours > 0"""
+    else:
+        freezing_rain = """-- Rain combined with freezing temperatures
+        CASE
+            WHEN rain_inches > 0
+                 AND (
+                     below_freezing_school_day
+                     OR below_freezing_school_day_apparent
+                 )"""
+
+    # formatted with https://www.dpriver.com/pp/sqlformat.htm
+    # commented with the help of ChatGPT 5.2 and Databricks AI SQL assistant
+    return f"""
+-- ============================================================
+--
+-- NCAA Division I Football Team Universities in Missouri
+--
+-- Final aggregation: One row per university
+-- Calculates number of severe-weather days and student-days
+-- impacted based on your chosen definitions.
+-- ============================================================
+
+SELECT
+    university,
+    state,
+    enrollment,
+
+    -- Count of school days where average temp < freezing
+    -- (SUM is HUGEINT in DuckDB; cast so every backend returns int64)
+    CAST(SUM(freezing_day) AS BIGINT) AS freezing_days,
+
+    -- Student-days impacted by freezing temps
+    -- (enrollment * number of freezing days)
+    CAST(SUM(freezing_day) AS BIGINT) * enrollment AS enrollment_freezing_days,
+
+    -- Count of days with snowfall OR snowfall in the lookback window
+    CAST(SUM(snow_day_or_before) AS BIGINT) AS snow_days,
+
+    -- Student-days impacted by snow conditions
+    CAST(SUM(snow_day_or_before) AS BIGINT) * enrollment AS enrollment_snow_day_or_before,
+
+    -- Count of days with rain while below freezing
+    -- (proxy for freezing rain / dangerous conditions)
+    CAST(SUM(freezing_rain_day) AS BIGINT) AS freezing_rain_days,
+
+    -- Student-days impacted by freezing rain
+    CAST(SUM(freezing_rain_day) AS BIGINT) * enrollment AS enrollment_freezing_rain_day,
+
+    -- List of student-days impacted by severe weather
+    {sql["severe_days"].format(severe = severe)} AS severe_days_list
+
+FROM (
+
+    -- ========================================================
+    -- Create daily flags indicating severe weather conditions
+    -- ========================================================
+    SELECT
+        source AS university,
+        state,
+        enrollment,
+        date,
+
+        -- Flag if the school day was below freezing
+        CASE
+            WHEN below_freezing_school_day
+                 OR below_freezing_school_day_apparent
+            THEN 1
+            ELSE 0
+        END AS freezing_day,
+
+        -- Flag if snow occurred today or in the lookback window
+        -- (captures lingering disruption)
+        CASE
+            WHEN db4_snowfall_inches > 0
+                 OR snowfall_inches > 0
+            THEN 1
+            ELSE 0
+        END AS snow_day_or_before,
+
+        -- Flag freezing rain condition
+        {freezing_rain}
+            THEN 1
+            ELSE 0
+        END AS freezing_rain_day
+
+    FROM (
+
+        -- ====================================================
+        -- Previous days' snowfall from a window over each school
+        -- Also compute freezing temperature indicators
+        -- ====================================================
+        SELECT
+            -- Plain strings and 64-bit enrollment, whatever the ingest
+            -- layer handed over (a categorical source sorts by category
+            -- order in DuckDB, not alphabetically)
+            CAST(source AS STRING) AS source,
+            CAST(state AS STRING) AS state,
+            date,
+            CAST(enrollment AS BIGINT) AS enrollment,
+
+            -- Day-of-week used to filter to school days
+            {sql["dow"]} AS dow,
+
+            -- Real temperature freezing check
+            (temperature_2m_max + temperature_2m_min) / 2 < {FREEZING_F}
+                AS below_freezing_school_day,
+
+            -- Apparent temperature freezing check
+            (apparent_temperature_max + apparent_temperature_min) / 2 < {FREEZING_F}
+                AS below_freezing_school_day_apparent,
+
+            -- Snow over the previous {lookback_days} day(s)
+            {lookback_sql(lookback_days)} AS db4_snowfall_inches,
+
+            -- Snow today
+            snowfall_sum AS snowfall_inches,
+
+            -- Rain today
+            rain_sum AS rain_inches{hourly_columns}
+
+        FROM {table}
+
+    ) AS x
+
+    -- Only count weekdays (school days)
+    WHERE dow IN ('Mon','Tue','Wed','Thu','Fri')
+
+    -- Restrict to the reporting period
+    AND date >= '{start_date}'
+
+) AS y
+
+-- Final aggregation grain: one row per university
+GROUP BY
+    university,
+    state,
+    enrollment
+
+ORDER BY
+    university,
+    state,
+    enrollment;
+"""
+
+
+def severe_weather_pandas(df, lookback_days=1, start_date="2026-01-01"):
+    """Same query as `severe_weather_sql`, in pandas/NumPy, for runs without Spark."""
+    df = df.sort_values(["source", "date"], kind = "stable", ignore_index = True)
+
+    # snow on the previous N calendar days of the same school, looked up by
+    # date so a gap in the rows isn't bridged; a day with no row is NaN and
+    # behaves like the SQL NULL (never > 0)
+    snow = df.set_index(["source", "date"])["snowfall_sum"]
+    before = np.fmax.reduce([
+        snow.reindex(pd.MultiIndex.from_arrays([df["source"], df["date"] - pd.Timedelta(days = k)])).to_numpy(dtype = np.float64)
+        for k in range(1, lookback_days + 1)
+    ])
+
+    freezing = (
+        ((df["temperature_2m_max"] + df["temperature_2m_min"]) / 2 < FREEZING_F)
+        | ((df["apparent_temperature_max"] + df["apparent_temperature_min"]) / 2 < FREEZING_F)
+    ).to_numpy()
+    if "freezing_rain_hours" in df:
+        # hourly rollup: freezing rain was judged hour by hour
+        freezing_rain = (df["freezing_rain_hours"] > 0).to_numpy()
+    else:
+        freezing_rain = (df["rain_sum"] > 0).to_numpy() & freezing
+
+    flags = pd.DataFrame({
+        "university": df["source"].astype(str),
+        "state": df["state"].astype(str),
+        "enrollment": df["enrollment"].astype(np.int64),
+        "date": df["date"],
+        "freezing_day": freezing.astype(np.int64),
+        "snow_day_or_before": ((before > 0) | (df["snowfall_sum"] > 0).to_numpy()).astype(np.int64),
+        "freezing_rain_day": freezing_rain.astype(np.int64),
+    })
+
+    # Only count weekdays (school days) in the reporting period
+    school_day = flags["date"].dt.dayofweek < 5
+    in_period = flags["date"] >= pd.Timestamp(start_date, tz = flags["date"].dt.tz)
+    flags = flags[school_day & in_period]
+
+    severe = flags[["freezing_day", "snow_day_or_before", "freezing_rain_day"]].any(axis = 1)
+    flags = flags.assign(severe_day = flags["date"].dt.strftime("%m-%d").where(severe))
+
+    result = flags.groupby(["university", "state", "enrollment"], sort = True).agg(
+        freezing_days = ("freezing_day", "sum"),
+        snow_days = ("snow_day_or_before", "sum"),
+        freezing_rain_days = ("freezing_rain_day", "sum"),
+        severe_days_list = ("severe_day", lambda days: days.dropna().tolist()),
+    ).reset_index()
+
+    enrollment = result["enrollment"]
+    return pd.DataFrame({
+        "university": result["university"],
+        "state": result["state"],
+        "enrollment": enrollment,
+        "freezing_days": result["freezing_days"],
+        "enrollment_freezing_days": result["freezing_days"] * enrollment,
+        "snow_days": result["snow_days"],
+        "enrollment_snow_day_or_before": result["snow_days"] * enrollment,
+        "freezing_rain_days": result["freezing_rain_days"],
+        "enrollment_freezing_rain_day": result["freezing_rain_days"] * enrollment,
+        "severe_days_list": result["severe_days_list"],
+    })
+
+
+################################################################################################
+# execution backends
+################################################################################################
+
+def choose_backend(rows):
+    local = "duckdb" if importlib.util.find_spec("duckdb") else "pandas"
+    if rows <= LOCAL_MAX_ROWS or not importlib.util.find_spec("pyspark"):
+        return local
+    return "spark"
+
+
+def for_spark(table):
+    # Spark's Arrow reader takes plain strings and microsecond timestamps
+    fields = []
+    for field in table.schema:
+        kind = field.type
+        if pa.types.is_dictionary(kind):
+            kind = kind.value_type
+        elif pa.types.is_timestamp(kind):
+            kind = pa.timestamp("us", tz = kind.tz)
+        fields.append(pa.field(field.name, kind))
+    return table.cast(pa.schema(fields))
+
+
+def spark_schema(table):
+    from pyspark.sql import types
+
+    spark_types = {
+        pa.string(): types.StringType(),
+        pa.int32(): types.IntegerType(),
+        pa.int64(): types.LongType(),
+        pa.float32(): types.FloatType(),
+        pa.float64(): types.DoubleType(),
+    }
+    return types.StructType([
+        types.StructField(field.name, types.TimestampType() if pa.types.is_timestamp(field.type) else spark_types[field.type])
+        for field in table.schema
+    ])
+
+
+def arrow_to_spark(spark, table):
+    """Hand an Arrow table to Spark with its declared schema, no inference."""
+    import pyspark
+
+    table = for_spark(table)
+    if int(pyspark.__version__.split(".")[0]) >= 4:
+        return spark.createDataFrame(table)
+
+    # Spark 3 only takes Arrow through pandas: give it the schema up front and
+    # make a failed Arrow conversion an error instead of a silent row-wise path
+    spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    spark.conf.set("spark.sql.execution.arrow.pyspark.fallback.enabled", "false")
+    return spark.createDataFrame(table.to_pandas(self_destruct = True, split_blocks = True), schema = spark_schema(table))
+
+
+def run_severe_weather(df, backend="auto", lookback_days=1, start_date="2026-01-01", spark=None, table="january_data"):
+    """Run the severe weather aggregation on `backend` and return it as pandas.
+
+    `df` is a pandas frame or an Arrow table from the ingest layer.
+    `backend` is "spark", "duckdb", "pandas" or "auto" (pick by row count,
+    see LOCAL_MAX_ROWS).  Every backend returns the same columns.  Rows
+    from the hourly rollup (with `freezing_rain_hours`) flag freezing rain
+    from those hours.
+    """
+    arrow = isinstance(df, pa.Table)
+    hourly = "freezing_rain_hours" in (df.column_names if arrow else df.columns)
+
+    if backend == "auto":
+        backend = choose_backend(df.num_rows if arrow else len(df))
+
+    if backend == "pandas":
+        return severe_weather_pandas(df.to_pandas() if arrow else df, lookback_days, start_date)
+
+    if backend == "duckdb":
+        import duckdb
+
+        con = duckdb.connect()
+        # day-of-week and the start date are judged in UTC, like the Spark session
+        con.execute("SET TimeZone = 'UTC'")
+        con.register(table, df)
+        return con.sql(severe_weather_sql(table, lookback_days, start_date, dialect = "duckdb", hourly = hourly)).df()
+
+    if backend == "spark":
+        if spark is None:
+            from pyspark.sql import SparkSession
+            # on Databricks this is the notebook's existing `spark`
+            spark = SparkSession.builder.getOrCreate()
+
+        spark_df = arrow_to_spark(spark, df) if arrow else spark.createDataFrame(df)
+        spark_df.createOrReplaceTempView(table)
+        return spark.sql(severe_weather_sql(table, lookback_days, start_date, dialect = "spark", hourly = hourly)).toPandas()
+
+    raise ValueError(f"unknown backend {backend!r}")
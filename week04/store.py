@@ -0,0 +1,186 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from weather import DAILY, arrow_schema
+
+
+ONE_DAY = timedelta(days = 1)
+
+
+def site_key(site):
+    return f"{site.latitude:.4f}_{site.longitude:.4f}"
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching inclusive (start, end) date ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + ONE_DAY:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(start, end, held):
+    """The parts of [start, end] not covered by the merged `held` ranges."""
+    gaps = []
+    for held_start, held_end in held:
+        if held_end < start or held_start > end:
+            continue
+        if held_start > start:
+            gaps.append((start, held_start - ONE_DAY))
+        start = max(start, held_end + ONE_DAY)
+    if start <= end:
+        gaps.append((start, end))
+    return gaps
+
+
+def months(start, end):
+    month = start.replace(day = 1)
+    while month <= end:
+        yield month.strftime("%Y-%m")
+        month = (month + timedelta(days = 32)).replace(day = 1)
+
+
+class WeatherStore:
+    """Local Parquet copy of everything already pulled from Open-Meteo.
+
+    Data lives under `root/site=<lat>_<lon>/month=<YYYY-MM>/data.parquet`
+    and `root/coverage.json` records, per site and variable, which day
+    ranges are held.  `fetch()` only asks the API for the gaps and serves
+    the rest from disk, so extending `end_date` costs the new days only.
+    Values are stored in the units of `weather.UNITS`.
+    """
+
+    def __init__(self, root="weather_store"):
+        self.root = Path(root)
+        self.manifest = self.root / "coverage.json"
+        self.coverage = {}
+        if self.manifest.exists():
+            self.coverage = json.loads(self.manifest.read_text())
+
+    def held(self, site, variable):
+        ranges = self.coverage.get(site_key(site), {}).get(variable, [])
+        return [(date.fromisoformat(start), date.fromisoformat(end)) for start, end in ranges]
+
+    def missing(self, site, variables, start, end):
+        """Day ranges in [start, end] where any of `variables` is not held."""
+        gaps = []
+        for variable in variables:
+            gaps += subtract_ranges(start, end, self.held(site, variable))
+        return merge_ranges(gaps)
+
+    def mark(self, site, variables, start, end):
+        entry = self.coverage.setdefault(site_key(site), {})
+        for variable in variables:
+            ranges = merge_ranges(self.held(site, variable) + [(start, end)])
+            entry[variable] = [[a.isoformat(), b.isoformat()] for a, b in ranges]
+
+    def save_manifest(self):
+        self.root.mkdir(parents = True, exist_ok = True)
+        tmp = self.manifest.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.coverage, indent = 1))
+        tmp.replace(self.manifest)
+
+    def partition(self, site, month):
+        return self.root / f"site={site_key(site)}" / f"month={month}" / "data.parquet"
+
+    def write(self, site, frame):
+        """Upsert one site's rows into its month partitions (new rows win)."""
+        frame = frame.assign(source = frame["source"].astype(str), state = frame["state"].astype(str))
+        for month, rows in frame.groupby(frame["date"].dt.strftime("%Y-%m")):
+            path = self.partition(site, month)
+            rows = rows.set_index("date")
+            if path.exists():
+                # new values win; columns only the old file has are kept
+                rows = rows.combine_first(pd.read_parquet(path).set_index("date"))
+            path.parent.mkdir(parents = True, exist_ok = True)
+            rows.sort_index().reset_index().to_parquet(path, index = False)
+
+    def read(self, site, variables, start, end):
+        paths = [self.partition(site, month) for month in months(start, end)]
+        frames = [pd.read_parquet(path, columns = ["date", "source", "enrollment", *variables])
+                  for path in paths if path.exists()]
+        if not frames:
+            return None
+        frame = pd.concat(frames, ignore_index = True)
+        day = frame["date"].dt.date
+        # the registry, not the stored copy, is the authority on name/state/enrollment
+        frame = frame[(day >= start) & (day <= end)].assign(source = site.source, enrollment = site.enrollment)
+        frame.insert(2, "state", site.state)
+        return frame
+
+    def read_arrow(self, site, variables, start, end):
+        """`read()` without pandas: an Arrow table in the `arrow_schema` layout."""
+        since = datetime(start.year, start.month, start.day, tzinfo = timezone.utc)
+        until = datetime(end.year, end.month, end.day, tzinfo = timezone.utc) + ONE_DAY
+        paths = [self.partition(site, month) for month in months(start, end)]
+        tables = [pq.read_table(path, columns = ["date", *variables], filters = [("date", ">=", since), ("date", "<", until)])
+                  for path in paths if path.exists()]
+        if not tables:
+            return None
+        table = pa.concat_tables(tables)
+        n = table.num_rows
+        source = pa.DictionaryArray.from_arrays(pa.array([0] * n, type = pa.int32()), pa.array([site.source]))
+        state = pa.DictionaryArray.from_arrays(pa.array([0] * n, type = pa.int32()), pa.array([site.state]))
+        table = (table.add_column(1, "source", source).add_column(2, "state", state)
+                 .add_column(3, "enrollment", pa.array([site.enrollment] * n, type = pa.int32())))
+        return table.cast(arrow_schema(variables))
+
+    def fetch(self, sites, start_date, end_date, fetch, variables=DAILY, arrow=False):
+        """Serve [start_date, end_date] for every site, calling
+        `fetch(sites, start_date, end_date, variables)` only for the gaps.
+
+        Sites with the same gap are fetched together so batching still
+        applies.  Only days that actually came back for a site are marked as
+        held, so days lost to a failed request are fetched again next time.
+        Days from today onward are stored but never marked as
+        held, since the forecast for them can still change.  With `arrow`
+        the result is read back as an Arrow table, never touching pandas.
+        """
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+        settled = datetime.now(timezone.utc).date() - ONE_DAY
+
+        by_gap = {}
+        for site in sites:
+            for gap in self.missing(site, variables, start, end):
+                by_gap.setdefault(gap, []).append(site)
+
+        for (gap_start, gap_end), gap_sites in by_gap.items():
+            frame = fetch(gap_sites, gap_start.isoformat(), gap_end.isoformat(), variables)
+            fetched = set(frame["source"].astype(str)) if len(frame) else set()
+            for site in gap_sites:
+                if site.source not in fetched:
+                    continue
+                rows = frame[frame["source"] == site.source]
+                self.write(site, rows)
+                # only the days that came back: a failed date window leaves
+                # its days missing, so the next fetch asks for them again
+                days = {day for day in rows["date"].dt.date if gap_start <= day <= min(gap_end, settled)}
+                for held_start, held_end in merge_ranges((day, day) for day in days):
+                    self.mark(site, variables, held_start, held_end)
+            self.save_manifest()
+
+        if arrow:
+            tables = [self.read_arrow(site, variables, start, end) for site in sites]
+            tables = [t for t in tables if t is not None]
+            if not tables:
+                return arrow_schema(variables).empty_table()
+            return pa.concat_tables(tables).unify_dictionaries()
+
+        frames = [self.read(site, variables, start, end) for site in sites]
+        frames = [f for f in frames if f is not None]
+        if not frames:
+            return pd.DataFrame(columns = ["date", "source", "state", "enrollment", *variables])
+        frame = pd.concat(frames, ignore_index = True)
+        frame["source"] = frame["source"].astype("category")
+        frame["state"] = frame["state"].astype("category")
+        frame["enrollment"] = frame["enrollment"].astype("int32")
+        return frame
@@ -0,0 +1,303 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+import openmeteo_requests
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import requests_cache
+from retry_requests import retry
+
+
+URL = "https://api.open-meteo.com/v1/forecast"
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+# Open-Meteo accepts comma separated latitude/longitude lists and answers with
+# one response per location, in the same order they were requested.  Keep each
+# call comfortably under the per-request location cap (and URL length limits)
+MAX_LOCATIONS_PER_CALL = 100
+
+# The order of variables in hourly or daily is important to assign them correctly below
+DAILY = [
+    "weather_code",
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "apparent_temperature_max",
+    "apparent_temperature_min",
+    "snowfall_sum",
+    "rain_sum",
+    "showers_sum",
+    "wind_speed_10m_max",
+    "wind_gusts_10m_max",
+    "precipitation_hours",
+]
+
+UNITS = {
+    "wind_speed_unit": "mph",
+    "temperature_unit": "fahrenheit",
+    "precipitation_unit": "inch",
+}
+
+
+def make_client(cache_name=".cache", expire_after=3600):
+    # Setup the Open-Meteo API client with cache and retry on error
+    cache_session = requests_cache.CachedSession(cache_name, expire_after = expire_after)
+    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
+    return openmeteo_requests.Client(session = retry_session)
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def locations(sites):
+    """Group sites that share coordinates, so each location is requested once.
+
+    Returns a list of site lists, one per distinct (latitude, longitude).
+    """
+    groups = {}
+    for site in sites:
+        groups.setdefault((site.latitude, site.longitude), []).append(site)
+    return list(groups.values())
+
+
+@lru_cache(maxsize = 64)
+def time_index(start, end, interval):
+    """Epoch seconds for one (start, end, interval) window, built once and
+    shared by every site that has the same window."""
+    index = np.arange(start, end, interval, dtype = np.int64)
+    index.flags.writeable = False
+    return index
+
+
+def decode_columns(pairs, variables=DAILY):
+    """Walk `(site, response)` pairs once into flat NumPy columns.
+
+    Row counts come from each FlatBuffers time header, then one contiguous
+    float32 column per variable is preallocated across all locations and
+    every `ValuesAsNumpy()` view is copied straight into its slice.
+    Returns `(seconds, codes, categories, states, enrollment, columns)`,
+    where `codes` index into the list of `categories` (site names) and
+    `states[i]` is the state of `categories[i]`.
+    """
+    blocks = [(site, response.Daily()) for site, response in pairs]
+    lengths = [(daily.TimeEnd() - daily.Time()) // daily.Interval() for _, daily in blocks]
+    total = sum(lengths)
+
+    seconds = np.empty(total, dtype = np.int64)
+    codes = np.empty(total, dtype = np.int32)
+    enrollment = np.empty(total, dtype = np.int32)
+    columns = {name: np.empty(total, dtype = np.float32) for name in variables}
+    categories = {}
+    states = []
+
+    offset = 0
+    for (site, daily), n in zip(blocks, lengths):
+        rows = slice(offset, offset + n)
+        seconds[rows] = time_index(daily.Time(), daily.TimeEnd(), daily.Interval())[:n]
+        if site.source not in categories:
+            categories[site.source] = len(categories)
+            states.append(site.state)
+        codes[rows] = categories[site.source]
+        enrollment[rows] = site.enrollment
+        # The order of variables needs to be the same as requested.
+        for i, name in enumerate(variables):
+            columns[name][rows] = daily.Variables(i).ValuesAsNumpy()
+        offset += n
+
+    return seconds, codes, list(categories), states, enrollment, columns
+
+
+def state_codes(codes, states):
+    """Map per-row site `codes` to codes into the distinct `states`, so the
+    state column is dictionary-encoded like `source`.  Returns
+    `(codes, values)`."""
+    values, lookup = np.unique(np.array(states, dtype = str), return_inverse = True)
+    return lookup.astype(np.int32)[codes], values.tolist()
+
+
+def decode_daily(pairs, variables=DAILY):
+    """Build one frame from `(site, response)` pairs, with `source` and
+    `state` as categoricals and `enrollment` int32 instead of a broadcast
+    Python object per row."""
+    return frame_from_columns(*decode_columns(pairs, variables))
+
+
+def frame_from_columns(seconds, codes, categories, states, enrollment, columns):
+    state, state_values = state_codes(codes, states)
+    data = {
+        "date": pd.to_datetime(seconds, unit = "s", utc = True),
+        "source": pd.Categorical.from_codes(codes, categories = categories),
+        "state": pd.Categorical.from_codes(state, categories = state_values),
+        "enrollment": enrollment,
+        **columns,
+    }
+    # copy=False keeps the preallocated columns as they are (no block consolidation)
+    return pd.DataFrame(data, copy = False)
+
+
+def arrow_schema(variables=DAILY):
+    return pa.schema([
+        ("date", pa.timestamp("s", tz = "UTC")),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("state", pa.dictionary(pa.int32(), pa.string())),
+        ("enrollment", pa.int32()),
+        *[(name, pa.float32()) for name in variables],
+    ])
+
+
+def decode_daily_arrow(pairs, variables=DAILY):
+    """Same columns as `decode_daily`, as an Arrow table with a declared
+    schema (timestamp[s, UTC], dictionary-encoded source and state, float32
+    measures).  The NumPy buffers are wrapped, not copied."""
+    seconds, codes, categories, states, enrollment, columns = decode_columns(pairs, variables)
+    state, state_values = state_codes(codes, states)
+
+    arrays = [
+        pa.array(seconds, type = pa.timestamp("s", tz = "UTC")),
+        pa.DictionaryArray.from_arrays(pa.array(codes), pa.array(categories, type = pa.string())),
+        pa.DictionaryArray.from_arrays(pa.array(state), pa.array(state_values, type = pa.string())),
+        pa.array(enrollment),
+        *[pa.array(columns[name]) for name in variables],
+    ]
+    return pa.Table.from_arrays(arrays, schema = arrow_schema(variables))
+
+
+def date_windows(start_date, end_date, days):
+    """Split an inclusive ISO date range into consecutive windows of `days`."""
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    while start <= end:
+        stop = min(start + timedelta(days = days - 1), end)
+        yield start.isoformat(), stop.isoformat()
+        start = stop + timedelta(days = 1)
+
+
+def fetch_chunk(client, chunk, start_date, end_date, variables=DAILY, url=URL, resolution="daily"):
+    """One batched Open-Meteo call for a chunk of locations (site lists from
+    `locations()`); returns `(site, response)` pairs, sharing a location's
+    response between all of its sites."""
+    params = {
+        "latitude": [group[0].latitude for group in chunk],
+        "longitude": [group[0].longitude for group in chunk],
+        resolution: variables,
+        **UNITS,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    responses = client.weather_api(url, params=params)
+
+    # one response per requested location, in request order
+    return [(site, response) for group, response in zip(chunk, responses) for site in group]
+
+
+def fetch_daily(client, sites, start_date, end_date, variables=DAILY, chunk_size=MAX_LOCATIONS_PER_CALL, url=URL, arrow=False):
+    """Fetch daily weather for every site, batching the locations into as few
+    Open-Meteo calls as the per-call limit allows.
+
+    `sites` are `registry.Site` rows; sites at the same coordinates share a
+    location in the request.  Returns one frame with a block of rows per
+    site (an Arrow table when `arrow` is set).
+    """
+    pairs = []
+
+    for chunk in chunked(locations(sites), chunk_size):
+        pairs += fetch_chunk(client, chunk, start_date, end_date, variables, url)
+
+    if arrow:
+        return decode_daily_arrow(pairs, variables)
+    return decode_daily(pairs, variables)
+
+
+################################################################################################
+# concurrent ingest
+################################################################################################
+
+class HostRateLimiter:
+    """Hands out start slots per host so no host sees more than `rate`
+    requests per second, however many worker threads are running."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def fetch_daily_concurrent(sites, start_date, end_date, variables=DAILY, url=URL,
+                           max_workers=8, requests_per_second=5, window_days=None,
+                           chunk_size=MAX_LOCATIONS_PER_CALL, client_factory=make_client):
+    """Fan batched requests for (site chunk, date window) pairs out over a
+    thread pool of `max_workers`.
+
+    Each worker thread gets its own client from `client_factory`, so the
+    cache + retry_requests backoff behaves exactly as in the serial path.
+    A chunk that still fails after retries is split into single-location
+    requests so one bad location can't sink its neighbours.  Returns
+    `(frame, failures)` where failures is a list of
+    `{"source", "start_date", "end_date", "error"}` dicts.
+    """
+    limiter = HostRateLimiter(requests_per_second)
+    local = threading.local()
+
+    if window_days:
+        windows = list(date_windows(start_date, end_date, window_days))
+    else:
+        windows = [(start_date, end_date)]
+
+    def client():
+        if not hasattr(local, "client"):
+            local.client = client_factory()
+        return local.client
+
+    def call(chunk, start, end):
+        limiter.wait(url)
+        return fetch_chunk(client(), chunk, start, end, variables, url)
+
+    def work(chunk, start, end):
+        try:
+            return call(chunk, start, end), []
+        except Exception as error:
+            if len(chunk) == 1:
+                return [], failed(chunk[0], start, end, error)
+
+        pairs, failures = [], []
+        for group in chunk:
+            try:
+                pairs += call([group], start, end)
+            except Exception as error:
+                failures += failed(group, start, end, error)
+        return pairs, failures
+
+    def failed(group, start, end, error):
+        return [{"source": site.source, "start_date": start, "end_date": end, "error": repr(error)} for site in group]
+
+    pairs, failures = [], []
+    with ThreadPoolExecutor(max_workers = max_workers) as pool:
+        futures = [pool.submit(work, chunk, start, end)
+                   for start, end in windows
+                   for chunk in chunked(locations(sites), chunk_size)]
+        for future in as_completed(futures):
+            done, lost = future.result()
+            pairs += done
+            failures += lost
+
+    # decode once, in (site, time) order, so the frame never needs a sort or concat
+    order = {site.source: i for i, site in enumerate(sites)}
+    pairs.sort(key = lambda pair: (order[pair[0].source], pair[1].Daily().Time()))
+    return decode_daily(pairs, variables), failures